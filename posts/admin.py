@@ -1,27 +1,89 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
 
 from .models import Post, Group, Comment, Follow
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author')
-    search_fields = ('author', 'text',)
+ESTIMATE_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для нефильтрованного списка большой таблицы — оценка вместо COUNT(*).
+
+    PostgreSQL берёт оценку из статистики pg_class, SQLite — наибольший pk.
+    С поиском и фильтрами считается точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        default = queryset.model._default_manager.all().query
+        if len(queryset.query.where.children) == len(default.where.children):
+            estimate = self.estimate(queryset)
+            if estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+    def estimate(self, queryset):
+        model = queryset.model
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            return int(row[0]) if row else 0
+        return model._base_manager.using(queryset.db).aggregate(
+            last=Max('pk')
+        )['last'] or 0
+
+
+# Префиксный поиск — регистрозависимый __startswith, а не ^ (istartswith):
+# LIKE 'x%' без UPPER использует индекс *_like с varchar_pattern_ops, который
+# Django создаёт в PostgreSQL для индексированных CharField. Полнотекстовые
+# поля так не индексируются, поэтому текст комментариев не ищется вовсе,
+# а поиск по тексту записи остаётся полным просмотром.
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class PostAdmin(ScalableAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
+    search_fields = ('text', 'author__username__startswith')
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
     empty_value_display = "-пусто-"
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'description')
-    search_fields = ('title',)
+    search_fields = ('title__startswith', 'slug__startswith')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdmin):
     list_display = ('pk', 'text', 'created', 'post', 'author')
-    search_fields = ('post',)
+    list_select_related = ('post', 'author')
+    search_fields = ('author__username__startswith',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = (
+        'user__username__startswith', 'author__username__startswith'
+    )
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
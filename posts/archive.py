@@ -0,0 +1,126 @@
+"""Архив старых записей.
+
+archive переносит записи старше ARCHIVE_AFTER_DAYS дней вместе с
+комментариями в таблицы ArchivedPost и ArchivedComment. Перенос идёт пачками
+по batch_size записей, каждая пачка — отдельная транзакция, так что горячие
+таблицы и их индексы остаются небольшими, а блокировки короткими. Первичные
+ключи сохраняются, поэтому адреса записей не меняются.
+
+Лайки, хештеги и упоминания архивной записи не переносятся: число лайков
+остаётся в likes_count, а в ленты тегов попадают только горячие записи.
+Файл изображения продолжает принадлежать записи — ссылка на него из архива
+учитывается в счётчике ImageBlob.
+
+post_view и profile читают архив прозрачно: get_post ищет запись в архиве,
+если её нет в горячей таблице, а Chain склеивает две выборки для Paginator.
+post_delete удаляет архивную запись сразу, вместе с комментариями и ссылкой
+на изображение.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from . import storage
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+
+BATCH_SIZE = 200
+POST_FIELDS = (
+    'id', 'text', 'text_html', 'pub_date', 'author_id', 'group_id', 'image',
+    'views', 'likes_count',
+)
+COMMENT_FIELDS = (
+    'id', 'post_id', 'author_id', 'text', 'text_html', 'created',
+)
+
+
+def _copy(instance, model, fields):
+    return model(**{name: getattr(instance, name) for name in fields})
+
+
+def archive_batch(posts):
+    ids = [post.pk for post in posts]
+    with transaction.atomic():
+        ArchivedPost.objects.bulk_create(
+            [_copy(post, ArchivedPost, POST_FIELDS) for post in posts]
+        )
+        ArchivedComment.objects.bulk_create(
+            _copy(comment, ArchivedComment, COMMENT_FIELDS)
+            for comment in Comment.objects.filter(post_id__in=ids)
+        )
+        # post_delete снимает ссылку на изображение, архив забирает её себе.
+        Post.all_objects.filter(pk__in=ids).delete()
+        for post in posts:
+            storage.retain(post.image.name)
+
+
+def archive(days=None, batch_size=BATCH_SIZE, limit=None):
+    """Переносит в архив записи старше days дней, возвращает их число."""
+    if days is None:
+        days = getattr(settings, 'ARCHIVE_AFTER_DAYS', 365)
+    cutoff = timezone.now() - timedelta(days=days)
+    queryset = Post.objects.filter(pub_date__lt=cutoff).order_by('pk')
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        posts = list(queryset[:size])
+        if not posts:
+            break
+        archive_batch(posts)
+        moved += len(posts)
+    return moved
+
+
+def get_post(username, post_id):
+    """Запись из горячей таблицы или из архива, иначе Http404."""
+    for model in (Post, ArchivedPost):
+        post = model.objects.filter(
+            id=post_id, author__username=username
+        ).select_related('author', 'group').first()
+        if post is not None:
+            return post
+    raise Http404
+
+
+class Chain:
+    """Последовательность из нескольких выборок подряд для Paginator.
+
+    Paginator берёт count() и срезы; каждый срез превращается в срезы
+    нужных выборок, поэтому архив запрашивается только на его страницах.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return self._counts
+
+    def count(self):
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            items = self[index:index + 1]
+            if not items:
+                raise IndexError(index)
+            return items[0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        items, offset = [], 0
+        for queryset, size in zip(self.querysets, self.counts()):
+            low, high = max(start - offset, 0), min(stop - offset, size)
+            if low < high:
+                items.extend(queryset[low:high])
+            offset += size
+            if offset >= stop:
+                break
+        return items
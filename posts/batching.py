@@ -0,0 +1,111 @@
+"""Накопление записей в памяти процесса и пакетный сброс в базу.
+
+Buffer собирает данные под блокировкой и раз в interval секунд отдаёт их
+write() одним вызовом из фонового потока. Если interval равен нулю, поток
+ничего не сбрасывает и сбрасывать нужно вручную через flush(). При ошибке
+базы данные возвращаются в буфер и попадут в следующий сброс, кроме
+IntegrityError: такую пачку повтор не исправит, поэтому она пишется в лог и
+отбрасывается, чтобы не блокировать все следующие сбросы. write() должен
+сам отсеивать строки, которые заведомо не вставятся. Если flush_at_exit
+включён, остаток сбрасывается при выходе процесса; данные, которые можно
+потерять, его выключают.
+"""
+import atexit
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+
+from django.db import DatabaseError, IntegrityError, close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class Buffer(ABC):
+    """Подклассы задают empty(), add_to(), combine() и write()."""
+    flush_at_exit = True
+    idle_sleep = 1
+
+    def __init__(self):
+        self._data = self.empty()
+        self._flushing = self.empty()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        if self.flush_at_exit:
+            atexit.register(self.flush)
+
+    @abstractmethod
+    def empty(self):
+        """Пустое хранилище данных: список, словарь, Counter."""
+
+    @abstractmethod
+    def add_to(self, data, item):
+        """Добавляет item в data на месте."""
+
+    @abstractmethod
+    def combine(self, older, newer):
+        """Объединяет две порции, не меняя их."""
+
+    @abstractmethod
+    def write(self, data):
+        """Записывает порцию в базу."""
+
+    def interval(self):
+        return 0
+
+    def add(self, item):
+        with self._lock:
+            self.add_to(self._data, item)
+        self._start()
+
+    def pending(self):
+        """Всё, что ещё не записано в базу, включая сбрасываемое сейчас."""
+        with self._lock:
+            return self.combine(self._flushing, self._data)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                data, self._data = self._data, self.empty()
+                self._flushing = data
+            if not data:
+                return 0
+            try:
+                self.write(data)
+            except IntegrityError:
+                logger.exception(
+                    '%s: dropped %d items', type(self).__name__, len(data)
+                )
+                return 0
+            except DatabaseError:
+                with self._lock:
+                    self._data = self.combine(data, self._data)
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = self.empty()
+            return len(data)
+
+    def _start(self):
+        if self._thread is not None or not self.interval():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=type(self).__name__, daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            interval = self.interval()
+            time.sleep(interval or self.idle_sleep)
+            if not interval:
+                continue
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Buffer flush failed')
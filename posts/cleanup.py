@@ -0,0 +1,118 @@
+"""Фоновая очистка удалённых записей и медиафайлов.
+
+post_delete только помечает запись как удалённую. Комментарии, файл
+изображения и саму строку записи удаляет purge_deleted небольшими пачками,
+чтобы не держать долгих блокировок базы.
+
+collect_orphans обходит MEDIA_ROOT/posts/ потоково и удаляет файлы, на
+которые не ссылается ни одна запись, вместе с их миниатюрами sorl.
+"""
+import os
+import time
+
+from django.conf import settings
+from sorl.thumbnail import delete as delete_with_thumbnails
+
+from . import storage
+from .models import ArchivedPost, Comment, ImageBlob, Post
+
+
+BATCH_SIZE = 500
+IMAGE_DIR = 'posts'
+MIN_ORPHAN_AGE = 60 * 60
+
+
+def delete_image(name, force=False):
+    """Удаляет файл и его миниатюры, если на него больше нет ссылок."""
+    if not force and storage.is_referenced(name):
+        return False
+    delete_with_thumbnails(name, delete_file=True)
+    ImageBlob.objects.filter(name=name).delete()
+    return True
+
+
+def purge_comments(post_id, batch_size=BATCH_SIZE):
+    purged = 0
+    while True:
+        ids = list(
+            Comment.objects.filter(post_id=post_id).values_list(
+                'pk', flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return purged
+        Comment.objects.filter(pk__in=ids).delete()
+        purged += len(ids)
+
+
+def purge_deleted(limit=100, batch_size=BATCH_SIZE):
+    """Удаляет до limit помеченных записей вместе с комментариями."""
+    posts = Post.all_objects.filter(is_deleted=True).order_by('pk')[:limit]
+    stats = {'posts': 0, 'comments': 0, 'images': 0}
+    for post in posts:
+        stats['comments'] += purge_comments(post.pk, batch_size)
+        image = post.image.name
+        post.delete()
+        stats['posts'] += 1
+        if image and delete_image(image):
+            stats['images'] += 1
+    return stats
+
+
+def scan_files(directory, root=None):
+    """Лениво отдаёт (имя в хранилище, размер, mtime) всех файлов каталога."""
+    root = root or settings.MEDIA_ROOT
+    with os.scandir(os.path.join(root, directory)) as entries:
+        for entry in entries:
+            name = '/'.join((directory, entry.name))
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_files(name, root)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                yield name, stat.st_size, stat.st_mtime
+
+
+def _orphans(batch):
+    names = [name for name, size in batch]
+    referenced = set()
+    for manager in (Post.all_objects, ArchivedPost.objects):
+        referenced.update(
+            manager.filter(image__in=names).values_list('image', flat=True)
+        )
+    return [(name, size) for name, size in batch if name not in referenced]
+
+
+def collect_orphans(dry_run=False, batch_size=BATCH_SIZE,
+                    min_age=MIN_ORPHAN_AGE, directory=IMAGE_DIR):
+    """Удаляет файлы без ссылок из Post.image и ArchivedPost.image.
+
+    Файлы моложе min_age секунд пропускаются: их запись может быть ещё
+    не сохранена.
+    """
+    started = time.monotonic()
+    stats = {'scanned': 0, 'orphans': 0, 'bytes': 0}
+    if not os.path.isdir(os.path.join(settings.MEDIA_ROOT, directory)):
+        stats['seconds'] = 0
+        return stats
+
+    threshold = time.time() - min_age
+    batch = []
+
+    def flush():
+        for name, size in _orphans(batch):
+            stats['orphans'] += 1
+            stats['bytes'] += size
+            if not dry_run:
+                delete_image(name, force=True)
+        batch.clear()
+
+    for name, size, mtime in scan_files(directory):
+        stats['scanned'] += 1
+        if mtime > threshold:
+            continue
+        batch.append((name, size))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    stats['seconds'] = time.monotonic() - started
+    return stats
@@ -0,0 +1,141 @@
+"""Очередь комментариев для всплесков записи.
+
+Если COMMENT_QUEUE включён, add_comment не пишет комментарий сам, а кладёт
+его в буфер процесса. Фоновый поток раз в COMMENT_FLUSH_INTERVAL секунд
+вставляет накопленное одной транзакцией многострочными INSERT. Сигналы при
+этом не срабатывают, поэтому text_html и время создания считаются заранее,
+в enqueue. Комментарии к удалённым записям и от удалённых авторов при сбросе
+отбрасываются.
+
+Пока комментарий ждёт сброса, post_view показывает его автору. Копия
+кладётся и в общий кеш на PENDING_TIMEOUT секунд, поэтому автор видит
+комментарий, даже если следующий запрос попал в другой процесс; для этого
+нужен общий бэкенд кеша. Уже вставленные комментарии отсеиваются по времени
+создания.
+
+Очередь живёт в памяти процесса: при штатной остановке остаток сбрасывается,
+но при падении процесса комментарии последнего интервала теряются. Об этом
+предупреждает системная проверка posts.W001.
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import rich_text
+from .batching import Buffer
+from .models import Comment, Post, User
+
+
+BATCH_SIZE = 500
+PENDING_TIMEOUT = 60
+
+
+class CommentBuffer(Buffer):
+    def empty(self):
+        return []
+
+    def add_to(self, data, item):
+        data.append(item)
+
+    def combine(self, older, newer):
+        return older + newer
+
+    def interval(self):
+        return getattr(settings, 'COMMENT_FLUSH_INTERVAL', 0.5)
+
+    def write(self, comments):
+        alive_posts = set(Post.all_objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('pk', flat=True))
+        alive_authors = set(User.objects.filter(
+            pk__in={comment.author_id for comment in comments}
+        ).values_list('pk', flat=True))
+        _insert([
+            comment for comment in comments
+            if comment.post_id in alive_posts
+            and comment.author_id in alive_authors
+        ])
+
+
+def _insert(comments):
+    """bulk_create в режиме raw, как у loaddata.
+
+    Так pre_save не вызывается и auto_now_add не заменяет время отправки
+    временем сброса.
+    """
+    if not comments:
+        return
+    using = router.db_for_write(Comment)
+    fields = [
+        field for field in Comment._meta.concrete_fields
+        if not field.primary_key
+    ]
+    size = min(
+        BATCH_SIZE,
+        connections[using].ops.bulk_batch_size(fields, comments) or BATCH_SIZE
+    )
+    with transaction.atomic(using=using):
+        for start in range(0, len(comments), size):
+            Comment._base_manager._insert(
+                comments[start:start + size], fields=fields,
+                raw=True, using=using
+            )
+
+
+buffer = CommentBuffer()
+
+
+def enabled():
+    return getattr(settings, 'COMMENT_QUEUE', False)
+
+
+def _pending_key(post_id, author_id):
+    return 'comment_queue:{}:{}'.format(post_id, author_id)
+
+
+def enqueue(comment):
+    comment.created = timezone.now()
+    comment.text_html = rich_text.render(comment.text)
+    buffer.add(comment)
+    key = _pending_key(comment.post_id, comment.author_id)
+    cache.set(key, cache.get(key, []) + [comment], PENDING_TIMEOUT)
+
+
+def pending_for(post_id, author_id):
+    pending = {
+        comment.created: comment
+        for comment in cache.get(_pending_key(post_id, author_id), [])
+    }
+    pending.update(
+        (comment.created, comment) for comment in buffer.pending()
+        if comment.post_id == post_id and comment.author_id == author_id
+    )
+    if not pending:
+        return []
+    stored = set(Comment.objects.filter(
+        post_id=post_id, author_id=author_id, created__in=list(pending)
+    ).values_list('created', flat=True))
+    return [
+        comment for created, comment in sorted(pending.items())
+        if created not in stored
+    ]
+
+
+def flush():
+    return buffer.flush()
+
+
+@checks.register()
+def check_durability(app_configs, **kwargs):
+    if not enabled():
+        return []
+    return [checks.Warning(
+        'COMMENT_QUEUE хранит комментарии в памяти процесса.',
+        hint=(
+            'При падении процесса теряются комментарии последних '
+            'COMMENT_FLUSH_INTERVAL секунд.'
+        ),
+        id='posts.W001',
+    )]
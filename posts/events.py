@@ -0,0 +1,151 @@
+"""Шина событий о новых записях и поток server-sent events для лент.
+
+После коммита новой записи сигнал публикует событие в брокер. LocalBroker
+рассылает его подписчикам внутри процесса и служит заменой внешнему pub/sub:
+другой брокер подключается через POST_EVENTS_BROKER с тем же интерфейсом
+subscribe/unsubscribe/publish.
+
+stream — ASGI-обработчик, его подключает yatube.asgi. Он держит соединение в
+цикле событий, не занимая поток. Под WSGI тот же адрес обслуживает
+views.post_events: он один раз отвечает числом новых записей и просит
+браузер переподключиться через RETRY_MS.
+"""
+import asyncio
+import json
+from threading import Lock
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+EVENTS_PATH = '/events/posts/'
+KEEPALIVE = 15
+RETRY_MS = 30000
+MAX_AUTHORS = 500
+
+
+class LocalBroker:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = Lock()
+
+    def subscribe(self, loop, queue):
+        with self._lock:
+            self._subscribers.add((loop, queue))
+
+    def unsubscribe(self, loop, queue):
+        with self._lock:
+            self._subscribers.discard((loop, queue))
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                self.unsubscribe(loop, queue)
+
+
+broker = import_string(
+    getattr(settings, 'POST_EVENTS_BROKER', 'posts.events.LocalBroker')
+)()
+
+
+def post_created(post):
+    broker.publish({
+        'id': post.pk,
+        'author': post.author_id,
+        'group': post.group_id,
+    })
+
+
+def parse_filter(params):
+    """Фильтр ленты из параметров запроса: group=<id> или authors=1,2,3."""
+    def ints(value):
+        return [int(item) for item in value.split(',') if item.isdigit()]
+
+    group = ints(params.get('group', ''))
+    authors = ints(params.get('authors', ''))[:MAX_AUTHORS]
+    last_id = ints(params.get('last_id', ''))
+    return {
+        'group': group[0] if group else None,
+        'authors': set(authors) if 'authors' in params else None,
+        'last_id': last_id[0] if last_id else 0,
+    }
+
+
+def matches(event, feed):
+    if event['id'] <= feed['last_id']:
+        return False
+    if feed['group'] is not None and event['group'] != feed['group']:
+        return False
+    if feed['authors'] is not None and event['author'] not in feed['authors']:
+        return False
+    return True
+
+
+def format_event(last_id, count):
+    """Событие «появилось count новых записей, последняя — last_id»."""
+    return 'id: {}\nevent: posts\ndata: {}\n\n'.format(
+        last_id, json.dumps({'count': count})
+    ).encode()
+
+
+async def stream(scope, receive, send):
+    params = {
+        key: values[-1] for key, values in parse_qs(
+            scope.get('query_string', b'').decode('latin-1')
+        ).items()
+    }
+    headers = dict(scope.get('headers', []))
+    feed = parse_filter(params)
+    last_event = headers.get(b'last-event-id', b'').decode('latin-1')
+    if last_event.isdigit():
+        feed['last_id'] = max(feed['last_id'], int(last_event))
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    broker.subscribe(loop, queue)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await _send_body(send, 'retry: {}\n\n'.format(RETRY_MS).encode())
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, pending = await asyncio.wait(
+                {getter, disconnected},
+                timeout=KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter not in done:
+                getter.cancel()
+                if disconnected in done:
+                    return
+                await _send_body(send, b': keepalive\n\n')
+                continue
+            event = getter.result()
+            if matches(event, feed):
+                feed['last_id'] = event['id']
+                await _send_body(send, format_event(event['id'], 1))
+    finally:
+        broker.unsubscribe(loop, queue)
+        disconnected.cancel()
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_body(send, body):
+    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
@@ -0,0 +1,161 @@
+"""RSS и Atom для главной ленты, сообществ и авторов.
+
+Лента кешируется целиком. Ключ кеша, ETag и Last-Modified строятся из
+времени последней записи в ленте (один запрос MAX по индексу pub_date) и
+версии posts.versions, которую сигналы меняют при правке или удалении
+записей. Пока
+в ленте ничего не изменилось, повторный запрос читалки получает 304.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import truncatechars
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import http_date
+
+from yatube.routers import primary
+
+from . import versions
+from .models import Group, Post
+
+
+User = get_user_model()
+
+VERSION_KEY = 'feeds:version'
+CACHE_TIMEOUT = 60 * 60
+FEED_SIZE = 20
+
+
+def version():
+    return versions.get(VERSION_KEY)
+
+
+def invalidate():
+    versions.bump(VERSION_KEY)
+
+
+class PostFeed(Feed):
+    title = 'Yatube: последние обновления'
+    description = 'Новые записи на Yatube'
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def link(self, obj):
+        return reverse('index')
+
+    def items(self, obj):
+        return self.posts(obj).select_related('author', 'group')[:FEED_SIZE]
+
+    def item_title(self, item):
+        return truncatechars(item.text, 80)
+
+    def item_description(self, item):
+        return item.text_html or item.text
+
+    def item_link(self, item):
+        return reverse('post', args=[item.author.username, item.id])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupFeed(PostFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+    def title(self, obj):
+        return 'Yatube: {}'.format(obj.title)
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('group', args=[obj.slug])
+
+
+class AuthorFeed(PostFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+    def title(self, obj):
+        return 'Yatube: {}'.format(obj.get_full_name() or obj.username)
+
+    def description(self, obj):
+        return 'Записи пользователя {}'.format(obj.username)
+
+    def link(self, obj):
+        return reverse('profile', args=[obj.username])
+
+
+class AtomPostFeed(PostFeed):
+    feed_type = Atom1Feed
+    subtitle = PostFeed.description
+
+
+class AtomGroupFeed(GroupFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AtomAuthorFeed(AuthorFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def cached(feed):
+    """Оборачивает ленту в кеш и условные ответы."""
+    def view(request, *args, **kwargs):
+        obj = feed.get_object(request, *args, **kwargs)
+        latest = feed.posts(obj).aggregate(latest=Max('pub_date'))['latest']
+        modified = int(latest.timestamp()) if latest else 0
+        stamp = '{}.{}'.format(
+            int(latest.timestamp() * 1000000) if latest else 0, version()
+        )
+        etag = '"{}"'.format(stamp)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified or None
+        )
+        if response is None:
+            key = 'feeds:{}:{}'.format(request.path, stamp)
+            entry = cache.get(key)
+            if entry is None:
+                with primary():
+                    response = feed(request, *args, **kwargs)
+                entry = (response.content, response['Content-Type'])
+                cache.set(key, entry, CACHE_TIMEOUT)
+            response = HttpResponse(entry[0], content_type=entry[1])
+        response['ETag'] = etag
+        if modified:
+            response['Last-Modified'] = http_date(modified)
+        return response
+    return view
+
+
+index_rss = cached(PostFeed())
+index_atom = cached(AtomPostFeed())
+group_rss = cached(GroupFeed())
+group_atom = cached(AtomGroupFeed())
+author_rss = cached(AuthorFeed())
+author_atom = cached(AtomAuthorFeed())
@@ -0,0 +1,103 @@
+"""Кеш статических страниц django.contrib.flatpages.
+
+Страница хранится в кеше под версией, которая меняется при любом сохранении
+или удалении FlatPage (posts.signals). Версия — токен posts.versions со
+временем изменения, из неё же строятся Last-Modified и ETag, так что
+повторный запрос браузера получает 304 без обращения к базе. Анонимным
+пользователям отдаётся готовый HTML из кеша, остальным страница рендерится
+заново, потому что в шапке выводится имя пользователя.
+
+Команда prerender_flatpages сохраняет страницы в FLATPAGES_PRERENDER_ROOT,
+чтобы фронтовой сервер мог отдавать их сам; при изменении страницы её файл
+удаляется.
+"""
+import copy
+import os
+
+from django.conf import settings
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.flatpages.views import render_flatpage
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, HttpResponsePermanentRedirect
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from yatube.routers import primary
+
+from . import versions
+
+
+VERSION_KEY = 'flatpages:version'
+CACHE_TIMEOUT = 60 * 60 * 24
+MISSING = ''
+
+
+def version():
+    return versions.get(VERSION_KEY)
+
+
+def invalidate(page=None):
+    versions.bump(VERSION_KEY)
+    if page is not None:
+        path = prerendered_path(page.url)
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+
+def prerendered_path(url):
+    root = getattr(settings, 'FLATPAGES_PRERENDER_ROOT', None)
+    if not root:
+        return None
+    return os.path.join(root, url.strip('/'), 'index.html')
+
+
+def get_page(url, site_id):
+    key = 'flatpages:{}:{}:{}'.format(version(), site_id, url)
+    page = cache.get(key)
+    if page is None:
+        with primary():
+            page = FlatPage.objects.filter(url=url, sites=site_id).first()
+        cache.set(key, page or MISSING, CACHE_TIMEOUT)
+    return page or None
+
+
+def flatpage(request, url):
+    if not url.startswith('/'):
+        url = '/' + url
+    site_id = get_current_site(request).id
+    page = get_page(url, site_id)
+    if page is None:
+        if not url.endswith('/') and settings.APPEND_SLASH:
+            if get_page(url + '/', site_id) is not None:
+                return HttpResponsePermanentRedirect(request.path + '/')
+        raise Http404
+
+    current = version()
+    etag = '"{}-{}-{}"'.format(current, page.pk, request.user.pk or 0)
+    modified = versions.timestamp(current)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=modified
+    )
+    if response is None:
+        if request.user.is_authenticated:
+            response = render_flatpage(request, copy.copy(page))
+        else:
+            response = _render_anonymous(request, page, current, site_id)
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _render_anonymous(request, page, current, site_id):
+    key = 'flatpages:{}:{}:{}:html'.format(current, site_id, page.url)
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content)
+    with primary():
+        response = render_flatpage(request, copy.copy(page))
+    if response.status_code == 200:
+        cache.set(key, response.content, CACHE_TIMEOUT)
+    return response
@@ -0,0 +1,144 @@
+"""Граф подписок в памяти процесса.
+
+Для каждого пользователя хранятся отсортированные массивы id подписчиков и
+авторов, на которых он подписан. Массивы живут в локальном словаре процесса и
+в общем кеше Django. У каждого списка своя версия в кеше — случайный токен.
+Изменение Follow заменяет токены только двух затронутых списков, и их старые
+копии перестают читаться. Токены не повторяются, поэтому после вытеснения
+версии из кеша старые записи не оживают.
+"""
+from array import array
+from bisect import bisect_left
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube.routers import primary
+
+from .models import Follow
+
+
+CACHE_TIMEOUT = getattr(settings, 'FOLLOW_GRAPH_CACHE_TIMEOUT', 60 * 60)
+LOCAL_SIZE = getattr(settings, 'FOLLOW_GRAPH_LOCAL_SIZE', 10000)
+
+FOLLOWERS = 'followers'
+FOLLOWING = 'following'
+
+_local = {}
+_local_versions = {}
+_lock = Lock()
+
+
+def _version_key(kind, user_id):
+    return 'follow_graph:version:{}:{}'.format(kind, user_id)
+
+
+def _version(kind, user_id):
+    key = _version_key(kind, user_id)
+    shared = cache.get(key)
+    if shared is None:
+        cache.add(key, uuid4().hex, None)
+        shared = cache.get(key)
+    return (shared, _local_versions.get((kind, user_id), 0))
+
+
+def invalidate(user_id, author_id):
+    """Сбрасывает списки, которые меняет подписка user_id на author_id."""
+    keys = ((FOLLOWING, user_id), (FOLLOWERS, author_id))
+    cache.set_many(
+        {_version_key(*key): uuid4().hex for key in keys}, None
+    )
+    with _lock:
+        for key in keys:
+            _local_versions[key] = _local_versions.get(key, 0) + 1
+            _local.pop(key, None)
+
+
+def reset_local():
+    """Забывает копии графа в памяти процесса."""
+    with _lock:
+        _local.clear()
+        _local_versions.clear()
+
+
+def _load(kind, user_id):
+    if kind == FOLLOWERS:
+        ids = Follow.objects.filter(author_id=user_id).values_list(
+            'user_id', flat=True
+        )
+    else:
+        ids = Follow.objects.filter(user_id=user_id).values_list(
+            'author_id', flat=True
+        )
+    return array('l', sorted(ids))
+
+
+def _adjacency(kind, user_id):
+    if user_id is None:
+        return array('l')
+    version = _version(kind, user_id)
+    key = (kind, user_id)
+    with _lock:
+        entry = _local.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    cache_key = 'follow_graph:{}:{}:{}'.format(kind, user_id, version[0])
+    raw = cache.get(cache_key)
+    if raw is None:
+        with primary():
+            ids = _load(kind, user_id)
+        cache.set(cache_key, ids.tobytes(), CACHE_TIMEOUT)
+    else:
+        ids = array('l')
+        ids.frombytes(raw)
+
+    with _lock:
+        if len(_local) >= LOCAL_SIZE:
+            _local.clear()
+        _local[key] = (version, ids)
+    return ids
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def followers(user_id):
+    return _adjacency(FOLLOWERS, user_id)
+
+
+def following(user_id):
+    return _adjacency(FOLLOWING, user_id)
+
+
+def followers_count(user_id):
+    return len(followers(user_id))
+
+
+def following_count(user_id):
+    return len(following(user_id))
+
+
+def is_following(user_id, author_id):
+    if user_id is None or author_id is None:
+        return False
+    return _contains(following(user_id), author_id)
+
+
+def is_mutual(user_id, other_id):
+    return (
+        is_following(user_id, other_id) and is_following(other_id, user_id)
+    )
+
+
+def mutual(user_id):
+    """id пользователей, с которыми у user_id взаимная подписка."""
+    subscribers = followers(user_id)
+    return [
+        author_id for author_id in following(user_id)
+        if _contains(subscribers, author_id)
+    ]
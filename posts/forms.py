@@ -1,5 +1,7 @@
 from django.forms import ModelForm
+from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
+from . import group_choices
 from .models import Post, Comment
 
 
@@ -18,6 +20,20 @@ class PostForm(ModelForm):
             'image': _('Добавьте изображение (необязательно)')
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['group']
+        field.iterator = group_choices.GroupChoiceIterator
+        field.selected = (
+            self.data.get(self.add_prefix('group'))
+            or self.instance.group_id
+        )
+        field.widget.choices = field.choices
+        if not group_choices.choices()[0]:
+            field.widget.attrs['data-autocomplete-url'] = reverse(
+                'group_autocomplete'
+            )
+
 
 class CommentForm(ModelForm):
     class Meta:
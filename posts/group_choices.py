@@ -0,0 +1,86 @@
+"""Список сообществ для поля group в PostForm.
+
+Пары (id, название) кешируются под версией posts.versions, которую сигналы
+Group меняют при любом изменении. Пока сообществ не больше
+GROUP_CHOICES_LIMIT, форма рисует обычный список из кеша без запроса к базе.
+Дальше в списке остаётся только выбранное сообщество, а остальные ищутся по
+началу названия или slug через views.group_autocomplete. Поиск
+регистрозависимый: LIKE без UPPER использует индексы title и slug.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.forms.models import ModelChoiceIterator
+
+from yatube.routers import primary
+
+from . import versions
+from .models import Group
+
+
+VERSION_KEY = 'group_choices:version'
+CACHE_TIMEOUT = 60 * 60
+AUTOCOMPLETE_SIZE = 20
+
+_local = {}
+
+
+def limit():
+    return getattr(settings, 'GROUP_CHOICES_LIMIT', 200)
+
+
+def invalidate():
+    versions.bump(VERSION_KEY)
+    _local.clear()
+
+
+def choices():
+    """(полный ли список, [(id, название), ...])."""
+    key = 'group_choices:{}:{}'.format(versions.get(VERSION_KEY), limit())
+    entry = _local.get(key)
+    if entry is not None:
+        return entry
+    entry = cache.get(key)
+    if entry is None:
+        with primary():
+            rows = list(
+                Group.objects.order_by('title').values_list('pk', 'title')[
+                    :limit() + 1
+                ]
+            )
+        entry = (len(rows) <= limit(), rows[:limit()])
+        cache.set(key, entry, CACHE_TIMEOUT)
+    _local.clear()
+    _local[key] = entry
+    return entry
+
+
+def search(query):
+    if not query:
+        return []
+    return list(Group.objects.filter(
+        Q(title__startswith=query) | Q(slug__startswith=query.lower())
+    ).order_by('title').values_list('pk', 'title')[:AUTOCOMPLETE_SIZE])
+
+
+class GroupChoiceIterator(ModelChoiceIterator):
+    """Варианты из кеша; при длинном списке — только выбранный."""
+
+    def groups(self):
+        complete, rows = choices()
+        if complete:
+            return rows
+        selected = str(getattr(self.field, 'selected', None) or '')
+        if not selected.isdigit():
+            return []
+        return list(
+            Group.objects.filter(pk=selected).values_list('pk', 'title')
+        )
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from self.groups()
+
+    def __len__(self):
+        return len(self.groups()) + (self.field.empty_label is not None)
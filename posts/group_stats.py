@@ -0,0 +1,143 @@
+"""Счётчики сообществ и рейтинг «популярные сообщества».
+
+post_count, author_count, last_post и velocity обновляются сигналами при
+сохранении и удалении записей. Архивные записи тоже учитываются: перенос в
+архив счётчики не меняет. Если строки статистики ещё нет, она один раз
+считается по всем записям сообщества. velocity — число записей за последние
+TRENDING_WINDOW часов: сигналы только прибавляют новые записи, а выбывшие
+из окна вычитает команда update_group_stats. Её нужно запускать по
+расписанию, например раз в час; она же полностью сверяет счётчики.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from yatube.routers import primary
+
+from .models import ArchivedPost, Group, GroupStats, Post
+
+
+TRENDING_WINDOW = getattr(settings, 'GROUP_TRENDING_WINDOW', 24)
+TRENDING_KEY = 'group_stats:trending'
+TRENDING_TIMEOUT = 60
+
+
+def _since(window=TRENDING_WINDOW):
+    return timezone.now() - timedelta(hours=window)
+
+
+def _empty():
+    return {
+        'post_count': 0, 'author_count': 0, 'last_post': None, 'velocity': 0
+    }
+
+
+def _totals(group_ids=None, window=TRENDING_WINDOW):
+    """{id сообщества: счётчики} по горячим и архивным записям."""
+    since = _since(window)
+    querysets = [
+        Post.objects.filter(group__isnull=False),
+        ArchivedPost.objects.filter(group__isnull=False),
+    ]
+    if group_ids is not None:
+        querysets = [qs.filter(group_id__in=group_ids) for qs in querysets]
+    totals = {}
+    for queryset in querysets:
+        rows = queryset.order_by().values('group_id').annotate(
+            total=Count('pk'),
+            last=Max('pub_date'),
+            recent=Count('pk', filter=Q(pub_date__gte=since)),
+        ).values_list('group_id', 'total', 'last', 'recent')
+        for group_id, total, last, recent in rows:
+            entry = totals.setdefault(group_id, _empty())
+            entry['post_count'] += total
+            entry['velocity'] += recent
+            if entry['last_post'] is None or last > entry['last_post']:
+                entry['last_post'] = last
+    hot, archived = (
+        queryset.order_by().values_list('group_id', 'author_id')
+        for queryset in querysets
+    )
+    for group_id, _ in hot.union(archived).iterator():
+        totals[group_id]['author_count'] += 1
+    return totals
+
+
+def _create(group_id):
+    """Создаёт строку по текущим записям сообщества, если её ещё нет."""
+    if GroupStats.objects.filter(pk=group_id).exists():
+        return False
+    totals = _totals([group_id]).get(group_id, _empty())
+    return GroupStats.objects.get_or_create(
+        group_id=group_id, defaults=totals
+    )[1]
+
+
+def _is_first_post(group_id, author_id, post_id):
+    return not any(
+        model.objects.filter(
+            group_id=group_id, author_id=author_id
+        ).exclude(pk=post_id).exists()
+        for model in (Post, ArchivedPost)
+    )
+
+
+def post_added(post):
+    if post.group_id is None or _create(post.group_id):
+        return
+    changes = {'post_count': F('post_count') + 1}
+    if _is_first_post(post.group_id, post.author_id, post.pk):
+        changes['author_count'] = F('author_count') + 1
+    if post.pub_date >= _since():
+        changes['velocity'] = F('velocity') + 1
+    GroupStats.objects.filter(pk=post.group_id).update(**changes)
+    GroupStats.objects.filter(
+        Q(last_post__lt=post.pub_date) | Q(last_post=None),
+        pk=post.group_id
+    ).update(last_post=post.pub_date)
+
+
+def post_removed(post, group_id):
+    if group_id is None:
+        return
+    changes = {'post_count': F('post_count') - 1}
+    if _is_first_post(group_id, post.author_id, post.pk):
+        changes['author_count'] = F('author_count') - 1
+    GroupStats.objects.filter(pk=group_id, post_count__gt=0).update(**changes)
+    if post.pub_date >= _since():
+        GroupStats.objects.filter(pk=group_id, velocity__gt=0).update(
+            velocity=F('velocity') - 1
+        )
+
+
+def rebuild(window=TRENDING_WINDOW):
+    """Полностью пересчитывает счётчики и velocity всех сообществ."""
+    totals = _totals(window=window)
+    stats = [
+        GroupStats(group_id=pk, **totals.get(pk, _empty()))
+        for pk in Group.objects.values_list('pk', flat=True).iterator()
+    ]
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        GroupStats.objects.bulk_create(stats, batch_size=500)
+    cache.delete(TRENDING_KEY)
+    return len(stats)
+
+
+def trending(limit=5):
+    groups = cache.get(TRENDING_KEY)
+    if groups is None:
+        with primary():
+            groups = [
+                stats.group for stats in GroupStats.objects.select_related(
+                    'group'
+                ).filter(velocity__gt=0).order_by(
+                    '-velocity', '-last_post'
+                )[:10]
+            ]
+        cache.set(TRENDING_KEY, groups, TRENDING_TIMEOUT)
+    return groups[:limit]
@@ -0,0 +1,49 @@
+"""Отметки «нравится».
+
+Число отметок хранится в Post.likes_count и меняется сигналами Like
+атомарным UPDATE с F(), так что ленты его не пересчитывают. Поставил ли
+отметку текущий пользователь, mark_liked выясняет одним запросом на всю
+страницу записей.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Like, Post
+
+
+def toggle(user, post):
+    """Ставит или снимает отметку, возвращает новое состояние."""
+    deleted, _ = Like.objects.filter(user=user, post=post).delete()
+    if deleted:
+        return False
+    try:
+        with transaction.atomic():
+            Like.objects.create(user=user, post=post)
+    except IntegrityError:
+        pass
+    return True
+
+
+def liked(post_id):
+    Post.all_objects.filter(pk=post_id).update(
+        likes_count=F('likes_count') + 1
+    )
+
+
+def unliked(post_id):
+    Post.all_objects.filter(pk=post_id, likes_count__gt=0).update(
+        likes_count=F('likes_count') - 1
+    )
+
+
+def mark_liked(user, posts):
+    """Проставляет post.liked каждой записи страницы."""
+    posts = list(posts)
+    liked_ids = set()
+    if user.is_authenticated and posts:
+        liked_ids = set(Like.objects.filter(
+            user=user, post_id__in=[post.id for post in posts]
+        ).values_list('post_id', flat=True))
+    for post in posts:
+        post.liked = post.id in liked_ids
+    return posts
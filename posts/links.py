@@ -0,0 +1,11 @@
+"""Абсолютные ссылки на сайт для писем и карты сайта.
+
+Домен берётся из django.contrib.sites, протокол — из SITE_PROTOCOL.
+"""
+from django.conf import settings
+from django.contrib.sites.models import Site
+
+
+def base_url():
+    protocol = getattr(settings, 'SITE_PROTOCOL', 'https')
+    return '{}://{}'.format(protocol, Site.objects.get_current().domain)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые записи с комментариями в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Возраст записей в днях, по умолчанию ARCHIVE_AFTER_DAYS'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=archive.BATCH_SIZE,
+            help='Сколько записей переносить за одну транзакцию'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Сколько записей обработать за один запуск'
+        )
+
+    def handle(self, *args, **options):
+        moved = archive.archive(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            limit=options['limit']
+        )
+        self.stdout.write('posts: {}'.format(moved))
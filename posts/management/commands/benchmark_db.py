@@ -0,0 +1,99 @@
+import threading
+import time
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест базы: параллельные комментарии и чтение ленты. '
+        'Сравнение SQLite и PostgreSQL — запуск с разным DJANGO_DB_ENGINE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Число параллельных клиентов'
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=10,
+            help='Длительность теста'
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля операций записи'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(
+            username='benchmark-db-{}'.format(uuid4().hex[:8])
+        )
+        post = Post.objects.create(text='benchmark', author=user)
+        stats = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+        deadline = time.monotonic() + options['seconds']
+        every = max(int(1 / options['write_ratio']), 1) \
+            if options['write_ratio'] else 0
+
+        def client():
+            done = {'reads': 0, 'writes': 0, 'errors': 0}
+            step = 0
+            try:
+                while time.monotonic() < deadline and not stop.is_set():
+                    step += 1
+                    try:
+                        if every and step % every == 0:
+                            with transaction.atomic():
+                                Comment.objects.create(
+                                    post=post, author=user, text='benchmark'
+                                )
+                            done['writes'] += 1
+                        else:
+                            list(Post.objects.select_related(
+                                'author', 'group'
+                            )[:10])
+                            done['reads'] += 1
+                    except OperationalError:
+                        done['errors'] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    for key, value in done.items():
+                        stats[key] += value
+
+        threads = [
+            threading.Thread(target=client)
+            for _ in range(options['threads'])
+        ]
+        started = time.monotonic()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            # Тестовые строки удаляются и после прерванного запуска.
+            stop.set()
+            for thread in threads:
+                if thread.is_alive():
+                    thread.join()
+            Post.all_objects.filter(pk=post.pk).delete()
+            user.delete()
+        seconds = time.monotonic() - started
+        self.stdout.write(
+            '{vendor}: {reads} reads ({read_rate:.0f}/s), '
+            '{writes} writes ({write_rate:.0f}/s), '
+            '{errors} errors in {seconds:.2f}s'.format(
+                vendor=connection.vendor,
+                read_rate=stats['reads'] / seconds,
+                write_rate=stats['writes'] / seconds,
+                seconds=seconds,
+                **stats
+            )
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов для всех пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=recommendations.TOP_N,
+            help='Сколько авторов хранить для каждого пользователя'
+        )
+
+    def handle(self, *args, **options):
+        stats = recommendations.build(top_n=options['top'])
+        self.stdout.write(
+            'created: {created}, updated: {updated}, '
+            'deleted: {deleted}'.format(**stats)
+        )
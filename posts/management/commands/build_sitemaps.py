@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает файлы карты сайта (запускать по расписанию)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shard-size', type=int, default=sitemaps.SHARD_SIZE,
+            help='Сколько адресов помещать в один файл'
+        )
+
+    def handle(self, *args, **options):
+        names = sitemaps.build(shard_size=options['shard_size'])
+        self.stdout.write('files: {}'.format(len(names)))
@@ -0,0 +1,46 @@
+import re
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+from posts.templates_warmup import template_files
+
+
+STATIC_TAG_RE = re.compile(r'{%\s*static\s+[\'"]([^\'"]+)[\'"]')
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, что каждая ссылка {% static %} в шаблонах есть '
+        'в манифесте collectstatic'
+    )
+
+    def handle(self, *args, **options):
+        manifest = getattr(staticfiles_storage, 'hashed_files', None)
+        if manifest is None:
+            raise CommandError(
+                'STATICFILES_STORAGE не использует манифест статики'
+            )
+        checked = set()
+        missing = []
+        paths = {
+            path for engine in engines.all()
+            for directory, path in template_files(engine)
+        }
+        for path in sorted(paths):
+            with open(path, encoding='utf-8') as f:
+                names = STATIC_TAG_RE.findall(f.read())
+            for name in names:
+                checked.add(name)
+                if staticfiles_storage.hash_key(name) not in manifest:
+                    missing.append((path, name))
+        for path, name in missing:
+            self.stderr.write('{}: {}'.format(path, name))
+        if missing:
+            raise CommandError(
+                'Нет в манифесте: {} из {} ссылок'.format(
+                    len({name for path, name in missing}), len(checked)
+                )
+            )
+        self.stdout.write('static references: {}'.format(len(checked)))
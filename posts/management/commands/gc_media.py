@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import cleanup
+
+
+class Command(BaseCommand):
+    help = 'Удаляет изображения без ссылок из записей и их миниатюры'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько файлов было бы удалено'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=cleanup.BATCH_SIZE,
+            help='Сколько имён файлов проверять за один запрос'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=cleanup.MIN_ORPHAN_AGE,
+            help='Не трогать файлы моложе указанного числа секунд'
+        )
+
+    def handle(self, *args, **options):
+        stats = cleanup.collect_orphans(
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+            min_age=options['min_age'],
+        )
+        rate = stats['scanned'] / stats['seconds'] if stats['seconds'] else 0
+        self.stdout.write(
+            '{prefix}scanned: {scanned}, orphans: {orphans}, '
+            'freed: {bytes} bytes, {seconds:.2f}s ({rate:.0f} files/s)'.format(
+                prefix='[dry run] ' if options['dry_run'] else '',
+                rate=rate,
+                **stats
+            )
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import tags
+
+
+class Command(BaseCommand):
+    help = 'Заполняет хештеги и упоминания по тексту всех записей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько записей обрабатывать за одну транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        count = tags.reindex(options['batch_size'])
+        self.stdout.write('posts: {}'.format(count))
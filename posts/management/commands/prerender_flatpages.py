@@ -0,0 +1,44 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.flatpages.models import FlatPage
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from posts import flatpages
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет статические страницы сайта в HTML-файлы, '
+        'которые фронтовой сервер может отдавать без приложения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.FLATPAGES_PRERENDER_ROOT,
+            help='Каталог для готовых страниц'
+        )
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        written = 0
+        pages = FlatPage.objects.filter(
+            sites=settings.SITE_ID, registration_required=False
+        )
+        for page in pages:
+            request = factory.get(page.url)
+            request.user = AnonymousUser()
+            response = flatpages.flatpage(request, page.url)
+            if response.status_code != 200:
+                continue
+            path = os.path.join(
+                options['output'], page.url.strip('/'), 'index.html'
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(response.content)
+            os.replace(path + '.tmp', path)
+            written += 1
+        self.stdout.write('Сохранено страниц: {}'.format(written))
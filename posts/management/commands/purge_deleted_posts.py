@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import cleanup
+
+
+class Command(BaseCommand):
+    help = 'Окончательно удаляет помеченные записи, их комментарии и файлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Сколько записей обработать за один запуск'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=cleanup.BATCH_SIZE,
+            help='Сколько комментариев удалять за один запрос'
+        )
+
+    def handle(self, *args, **options):
+        stats = cleanup.purge_deleted(
+            limit=options['limit'], batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            'posts: {posts}, comments: {comments}, '
+            'images: {images}'.format(**stats)
+        )
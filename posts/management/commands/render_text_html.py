@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from posts import rich_text
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Заполняет text_html у записей и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько строк обрабатывать за один запрос'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перерисовать все строки, а не только пустые'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            count = render_all(
+                model._base_manager, options['batch_size'], options['all']
+            )
+            self.stdout.write('{}: {}'.format(model._meta.model_name, count))
+
+
+def render_all(manager, batch_size, everything=False):
+    queryset = manager.only('pk', 'text', 'text_html').order_by('pk')
+    if not everything:
+        queryset = queryset.filter(text_html='')
+    last, count = 0, 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last)[:batch_size])
+        if not rows:
+            return count
+        for row in rows:
+            row.text_html = rich_text.render(row.text)
+        manager.bulk_update(rows, ['text_html'], batch_size=batch_size)
+        last = rows[-1].pk
+        count += len(rows)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import group_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает статистику сообществ и рейтинг популярных. '
+        'Запускать по расписанию, например раз в час'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int, default=group_stats.TRENDING_WINDOW,
+            help='Окно для подсчёта популярности, в часах'
+        )
+
+    def handle(self, *args, **options):
+        count = group_stats.rebuild(window=options['window'])
+        self.stdout.write('groups: {}'.format(count))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.templates_warmup import warm
+
+
+class Command(BaseCommand):
+    help = 'Загружает и проверяет все шаблоны, прогревая кеш загрузчика'
+
+    def handle(self, *args, **options):
+        loaded, errors = warm()
+        for name, error in errors:
+            self.stderr.write('{}: {}'.format(name, error))
+        if errors:
+            raise CommandError('Ошибок в шаблонах: {}'.format(len(errors)))
+        self.stdout.write('templates: {}'.format(loaded))
@@ -0,0 +1,183 @@
+"""Отдача медиафайлов.
+
+Если задан MEDIA_ACCEL_REDIRECT_PREFIX, приложение только проверяет путь и
+передаёт отдачу фронтовому прокси заголовком MEDIA_SENDFILE_HEADER
+(X-Accel-Redirect для nginx, X-Sendfile для Apache/lighttpd). Иначе файл
+отдаётся через FileResponse, который использует wsgi.file_wrapper, с
+поддержкой Range, ETag и условных запросов.
+
+serve_static отдаёт STATIC_ROOT тем же способом: файлам с хешем в имени
+ставится годовой Cache-Control, а при подходящем Accept-Encoding отдаётся
+заранее сжатая копия .br или .gz.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+    StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.static import was_modified_since
+
+
+SERVE_DIRS = getattr(settings, 'MEDIA_SERVE_DIRS', ('posts/', 'cache/'))
+CACHE_MAX_AGE = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 60 * 60 * 24 * 365)
+CHUNK_SIZE = 64 * 1024
+
+STATIC_MAX_AGE = 60
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+HASHED_STATIC_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+
+def _resolve(path, document_root, allowed_dirs):
+    if allowed_dirs is not None and not path.startswith(tuple(allowed_dirs)):
+        raise Http404
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(document_root, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path, stat
+
+
+def _byte_range(match, size):
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    elif end:
+        start = max(size - int(end), 0)
+        end = size - 1
+    else:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _set_cache_headers(response, etag, stat, max_age):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = 'public, max-age={}{}'.format(
+        max_age, ', immutable' if max_age >= CACHE_MAX_AGE else ''
+    )
+    return response
+
+
+def _precompressed(request, full_path):
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for coding, suffix in PRECOMPRESSED:
+        if coding in accepted and os.path.isfile(full_path + suffix):
+            return coding, full_path + suffix
+    return None, full_path
+
+
+def serve_file(request, path, document_root, allowed_dirs=None,
+               max_age=CACHE_MAX_AGE, accel_prefix=None,
+               precompressed=False):
+    full_path, stat = _resolve(path, document_root, allowed_dirs)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if precompressed and encoding is None:
+        encoding, full_path = _precompressed(request, full_path)
+        if encoding:
+            stat = os.stat(full_path)
+    etag = '"{:x}-{:x}"'.format(stat.st_mtime_ns, stat.st_size)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        not_modified = (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        )
+    else:
+        not_modified = not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size
+        )
+    if not_modified:
+        return _set_cache_headers(
+            HttpResponseNotModified(), etag, stat, max_age
+        )
+
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        header = getattr(settings, 'MEDIA_SENDFILE_HEADER', 'X-Accel-Redirect')
+        if header == 'X-Accel-Redirect':
+            response[header] = accel_prefix + quote(path)
+        else:
+            response[header] = full_path
+        return _set_cache_headers(response, etag, stat, max_age)
+
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', ''))
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if match and if_range in (None, etag):
+        byte_range = _byte_range(match, stat.st_size)
+        if byte_range is None:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(stat.st_size)
+            return response
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, length),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(
+            start, end, stat.st_size
+        )
+    else:
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if precompressed:
+        response['Vary'] = 'Accept-Encoding'
+    response['Accept-Ranges'] = 'bytes'
+    return _set_cache_headers(response, etag, stat, max_age)
+
+
+def serve_media(request, path):
+    return serve_file(
+        request, path, settings.MEDIA_ROOT,
+        allowed_dirs=SERVE_DIRS,
+        accel_prefix=getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    )
+
+
+def serve_static(request, path):
+    if not (settings.DEBUG or getattr(settings, 'SERVE_STATIC', False)):
+        raise Http404
+    hashed = HASHED_STATIC_RE.search(path) is not None
+    return serve_file(
+        request, path, settings.STATIC_ROOT,
+        max_age=CACHE_MAX_AGE if hashed else STATIC_MAX_AGE,
+        precompressed=True
+    )
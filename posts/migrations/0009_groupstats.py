@@ -0,0 +1,24 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('author_count', models.PositiveIntegerField(default=0, verbose_name='Авторов')),
+                ('last_post', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+                ('velocity', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Записей за период')),
+            ],
+        ),
+    ]
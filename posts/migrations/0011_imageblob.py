@@ -0,0 +1,35 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:56
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    rows = Post.objects.exclude(image='').exclude(image=None).order_by(
+    ).values('image').annotate(
+        refcount=Count('pk')
+    ).values_list('image', 'refcount')
+    ImageBlob.objects.bulk_create(
+        (ImageBlob(name=name, refcount=refcount) for name, refcount in rows),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_is_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
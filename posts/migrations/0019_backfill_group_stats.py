@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    ArchivedPost = apps.get_model('posts', 'ArchivedPost')
+    window = getattr(settings, 'GROUP_TRENDING_WINDOW', 24)
+    since = timezone.now() - timedelta(hours=window)
+    missing = list(
+        Group.objects.filter(stats__isnull=True).values_list('pk', flat=True)
+    )
+    querysets = [
+        Post.objects.filter(is_deleted=False, group_id__in=missing),
+        ArchivedPost.objects.filter(group_id__in=missing),
+    ]
+    totals = {pk: [0, 0, None, 0] for pk in missing}
+    for queryset in querysets:
+        rows = queryset.order_by().values('group_id').annotate(
+            total=Count('pk'),
+            last=Max('pub_date'),
+            recent=Count('pk', filter=Q(pub_date__gte=since)),
+        ).values_list('group_id', 'total', 'last', 'recent')
+        for pk, total, last, recent in rows:
+            entry = totals[pk]
+            entry[0] += total
+            if entry[2] is None or last > entry[2]:
+                entry[2] = last
+            entry[3] += recent
+    hot, archived = (
+        queryset.order_by().values_list('group_id', 'author_id')
+        for queryset in querysets
+    )
+    for pk, _ in hot.union(archived).iterator():
+        totals[pk][1] += 1
+    GroupStats.objects.bulk_create([
+        GroupStats(
+            group_id=pk,
+            post_count=total,
+            author_count=authors,
+            last_post=last,
+            velocity=recent
+        )
+        for pk, (total, authors, last, recent) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
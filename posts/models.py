@@ -8,6 +8,7 @@ User = get_user_model()
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
+        db_index=True,
         verbose_name='Название сообщества'
     )
     slug = models.SlugField(unique=True, blank=True)
@@ -17,9 +18,29 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class PostManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class LoadedValuesMixin:
+    """Запоминает загруженные из базы значения в _loaded_values."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class Post(LoadedValuesMixin, models.Model):
     text = models.TextField(verbose_name='Текст поста')
-    pub_date = models.DateTimeField('date published', auto_now_add=True)
+    text_html = models.TextField(blank=True, editable=False)
+    pub_date = models.DateTimeField(
+        'date published',
+        auto_now_add=True,
+        db_index=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -35,6 +56,14 @@ class Post(models.Model):
         verbose_name='Сообщество'
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    is_deleted = models.BooleanField(default=False, db_index=True)
+    views = models.PositiveIntegerField('Просмотров', default=0)
+    likes_count = models.PositiveIntegerField('Отметок «нравится»', default=0)
+
+    is_archived = False
+
+    objects = PostManager()
+    all_objects = models.Manager()
 
     class Meta():
         ordering = ('-pub_date',)
@@ -42,8 +71,12 @@ class Post(models.Model):
     def __str__(self):
         return self.text
 
+    def tombstone(self):
+        self.is_deleted = True
+        self.save(update_fields=['is_deleted'])
+
 
-class Comment(models.Model):
+class Comment(LoadedValuesMixin, models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -55,7 +88,12 @@ class Comment(models.Model):
         related_name='comments'
     )
     text = models.TextField(verbose_name='Текст комментария')
-    created = models.DateTimeField('date published', auto_now_add=True)
+    text_html = models.TextField(blank=True, editable=False)
+    created = models.DateTimeField(
+        'date published',
+        auto_now_add=True,
+        db_index=True
+    )
 
     def __str__(self):
         return self.text
@@ -75,3 +113,164 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = [['user', 'author']]
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    created = models.DateTimeField('date liked', auto_now_add=True)
+
+    class Meta:
+        unique_together = [['user', 'post']]
+
+
+class Tag(models.Model):
+    name = models.CharField('Хештег', max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class TaggedPost(models.Model):
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='tagged'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tagged'
+    )
+
+    class Meta:
+        unique_together = [['tag', 'post']]
+
+
+class Mention(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions'
+    )
+
+    class Meta:
+        unique_together = [['post', 'user']]
+
+
+class Recommendation(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recommendation'
+    )
+    authors = models.TextField(
+        blank=True,
+        verbose_name='Рекомендованные авторы'
+    )
+    updated = models.DateTimeField('date updated', auto_now=True)
+
+    def author_ids(self):
+        return [int(pk) for pk in self.authors.split(',') if pk]
+
+
+class ProfileStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='profile_stats'
+    )
+    views = models.PositiveIntegerField('Просмотров профиля', default=0)
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    post_count = models.PositiveIntegerField('Записей', default=0)
+    author_count = models.PositiveIntegerField('Авторов', default=0)
+    last_post = models.DateTimeField('Последняя запись', blank=True, null=True)
+    velocity = models.PositiveIntegerField(
+        'Записей за период',
+        default=0,
+        db_index=True
+    )
+
+
+class ImageBlob(models.Model):
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+
+class ArchivedPost(LoadedValuesMixin, models.Model):
+    """Запись, перенесённая из горячей таблицы командой archive_posts."""
+    is_archived = True
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Текст поста')
+    text_html = models.TextField(blank=True, editable=False)
+    pub_date = models.DateTimeField('date published', db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        verbose_name='Сообщество'
+    )
+    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    views = models.PositiveIntegerField('Просмотров', default=0)
+    likes_count = models.PositiveIntegerField('Отметок «нравится»', default=0)
+
+    class Meta():
+        ordering = ('-pub_date',)
+
+    def __str__(self):
+        return self.text
+
+
+class ArchivedComment(LoadedValuesMixin, models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField(verbose_name='Текст комментария')
+    text_html = models.TextField(blank=True, editable=False)
+    created = models.DateTimeField('date published')
+
+    class Meta:
+        ordering = ('created',)
+
+    def __str__(self):
+        return self.text
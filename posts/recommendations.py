@@ -0,0 +1,116 @@
+"""Рекомендации авторов («кого почитать»).
+
+Считаются пакетно командой build_recommendations: граф подписок и связи
+«автор — сообщество» читаются из базы одним проходом, оценки считаются в
+памяти, а в таблицу Recommendation записываются только изменившиеся строки.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from . import follow_graph
+from .models import Follow, Post, Recommendation
+
+
+User = get_user_model()
+
+TOP_N = getattr(settings, 'RECOMMENDATIONS_TOP_N', 10)
+FRIEND_OF_FRIEND_WEIGHT = 2
+SHARED_GROUP_WEIGHT = 1
+BATCH_SIZE = 500
+
+
+def load_graph():
+    following = defaultdict(set)
+    rows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in rows.iterator():
+        following[user_id].add(author_id)
+
+    group_authors = defaultdict(set)
+    author_groups = defaultdict(set)
+    rows = Post.objects.exclude(group=None).order_by().values_list(
+        'group_id', 'author_id'
+    ).distinct()
+    for group_id, author_id in rows.iterator():
+        group_authors[group_id].add(author_id)
+        author_groups[author_id].add(group_id)
+    return following, group_authors, author_groups
+
+
+def score_user(user_id, following, group_authors, author_groups, top_n):
+    followed = following.get(user_id, ())
+    scores = Counter()
+    for friend_id in followed:
+        for candidate_id in following.get(friend_id, ()):
+            scores[candidate_id] += FRIEND_OF_FRIEND_WEIGHT
+    for group_id in author_groups.get(user_id, ()):
+        for candidate_id in group_authors[group_id]:
+            scores[candidate_id] += SHARED_GROUP_WEIGHT
+    scores.pop(user_id, None)
+    for author_id in followed:
+        scores.pop(author_id, None)
+    best = heapq.nlargest(
+        top_n, scores.items(), key=lambda item: (item[1], -item[0])
+    )
+    return [author_id for author_id, score in best]
+
+
+def build(top_n=TOP_N):
+    """Пересчитывает рекомендации всех пользователей.
+
+    Возвращает словарь с числом созданных, обновлённых и удалённых строк.
+    """
+    following, group_authors, author_groups = load_graph()
+    stored = dict(Recommendation.objects.values_list('user_id', 'authors'))
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for user_id in set(following) | set(author_groups):
+        authors = ','.join(
+            str(pk) for pk in score_user(
+                user_id, following, group_authors, author_groups, top_n
+            )
+        )
+        old = stored.pop(user_id, None)
+        if old is None:
+            if authors:
+                to_create.append(
+                    Recommendation(user_id=user_id, authors=authors)
+                )
+        elif old != authors:
+            to_update.append(
+                Recommendation(user_id=user_id, authors=authors, updated=now)
+            )
+
+    Recommendation.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    Recommendation.objects.bulk_update(
+        to_update, ['authors', 'updated'], batch_size=BATCH_SIZE
+    )
+    stale = list(stored)
+    for start in range(0, len(stale), BATCH_SIZE):
+        Recommendation.objects.filter(
+            user_id__in=stale[start:start + BATCH_SIZE]
+        ).delete()
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(stale),
+    }
+
+
+def suggested_authors(user, limit=5):
+    if not user.is_authenticated:
+        return []
+    recommendation = Recommendation.objects.filter(user_id=user.id).first()
+    if recommendation is None:
+        return []
+    author_ids = [
+        pk for pk in recommendation.author_ids()
+        if not follow_graph.is_following(user.id, pk)
+    ][:limit]
+    authors = User.objects.in_bulk(author_ids)
+    return [authors[pk] for pk in author_ids if pk in authors]
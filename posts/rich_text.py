@@ -0,0 +1,70 @@
+"""Текст записей и комментариев в виде готового HTML.
+
+render() один раз при сохранении превращает исходный текст в безопасный
+HTML: весь текст экранируется, ссылки, хештеги и упоминания существующих
+пользователей становятся ссылками, переносы строк — абзацами и <br>.
+Результат хранится в text_html рядом с исходником, и шаблоны выводят его
+как есть. Пока text_html пуст (старые записи до render_text_html), шаблон
+показывает экранированный исходный текст.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.html import escape, linebreaks
+
+from .tags import HASHTAG_RE, MENTION_RE
+
+
+User = get_user_model()
+
+URL_RE = re.compile(r'https?://[^\s<>"\']+')
+TRAILING_PUNCTUATION = '.,:;!?)'
+TOKEN_RE = re.compile('|'.join(
+    '(?P<{}>{})'.format(name, regex.pattern) for name, regex in (
+        ('url', URL_RE), ('tag', HASHTAG_RE), ('mention', MENTION_RE),
+    )
+))
+
+
+def _link(href, text, external=False):
+    return '<a href="{}"{}>{}</a>'.format(
+        escape(href), ' rel="nofollow"' if external else '', escape(text)
+    )
+
+
+def _token(match, usernames):
+    kind, text = match.lastgroup, match.group()
+    if kind == 'url':
+        url = text.rstrip(TRAILING_PUNCTUATION)
+        return _link(url, url, external=True) + escape(text[len(url):])
+    if kind == 'tag':
+        return _link(reverse('tag', args=[text[1:].lower()]), text)
+    username = text[1:].rstrip('.')
+    if username in usernames:
+        return _link(
+            reverse('profile', args=[username]), '@' + username
+        ) + escape(text[len(username) + 1:])
+    return escape(text)
+
+
+def render(text):
+    text = text or ''
+    names = {name.rstrip('.') for name in MENTION_RE.findall(text)}
+    usernames = set(User.objects.filter(username__in=names).values_list(
+        'username', flat=True
+    )) if names else set()
+    parts, position = [], 0
+    for match in TOKEN_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(_token(match, usernames))
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return linebreaks(''.join(parts))
+
+
+def needs_render(instance):
+    if not instance.text_html:
+        return True
+    loaded = getattr(instance, '_loaded_values', {})
+    return loaded.get('text', instance.text) != instance.text
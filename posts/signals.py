@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.contrib.flatpages.models import FlatPage
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    events, feeds, flatpages, follow_graph, group_choices, group_stats,
+    likes, rich_text, storage, tags
+)
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Group, Like, Post
+)
+
+
+@receiver(connection_created)
+def sqlite_connected(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA {} = {}'.format(name, value))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    follow_graph.invalidate(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    group_choices.invalidate()
+
+
+@receiver(post_save, sender=FlatPage)
+@receiver(post_delete, sender=FlatPage)
+def flatpage_changed(sender, instance, **kwargs):
+    flatpages.invalidate(instance)
+
+
+@receiver(m2m_changed, sender=FlatPage.sites.through)
+def flatpage_sites_changed(sender, instance, **kwargs):
+    if isinstance(instance, FlatPage):
+        flatpages.invalidate(instance)
+    else:
+        flatpages.invalidate()
+
+
+@receiver(post_save, sender=Like)
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        likes.liked(instance.post_id)
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    likes.unliked(instance.post_id)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+@receiver(pre_save, sender=ArchivedPost)
+@receiver(pre_save, sender=ArchivedComment)
+def render_text(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    if rich_text.needs_render(instance):
+        instance.text_html = rich_text.render(instance.text)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=ArchivedPost)
+@receiver(post_save, sender=ArchivedComment)
+def text_saved(sender, instance, **kwargs):
+    instance._loaded_values = {'text': instance.text}
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    image = instance.image.name or None
+    if created:
+        storage.retain(image)
+    elif 'image' in loaded and (loaded['image'] or None) != image:
+        storage.release(loaded['image'])
+        storage.retain(image)
+
+    if update_fields and 'is_deleted' in update_fields:
+        if instance.is_deleted:
+            group_stats.post_removed(instance, instance.group_id)
+    elif created:
+        group_stats.post_added(instance)
+        transaction.on_commit(lambda: events.post_created(instance))
+    elif 'group_id' in loaded and loaded['group_id'] != instance.group_id:
+        group_stats.post_removed(instance, loaded['group_id'])
+        group_stats.post_added(instance)
+    if not created:
+        feeds.invalidate()
+    if created or loaded.get('text', instance.text) != instance.text:
+        tags.index_post(instance)
+    instance._loaded_values = {
+        'group_id': instance.group_id,
+        'image': image,
+        'text': instance.text,
+    }
+
+
+@receiver(post_delete, sender=ArchivedPost)
+def archived_post_deleted(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+    group_stats.post_removed(instance, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+    feeds.invalidate()
+    if instance.is_deleted:
+        return
+    # archive_batch сначала копирует запись в архив, счётчики не меняются.
+    if not ArchivedPost.objects.filter(pk=instance.pk).exists():
+        group_stats.post_removed(instance, instance.group_id)
@@ -0,0 +1,139 @@
+"""Карта сайта: индекс sitemap.xml и файлы-осколки по SHARD_SIZE адресов.
+
+Команда build_sitemaps пишет файлы в SITEMAP_ROOT. Записи (в том числе
+архивные), профили и сообщества перебираются диапазонами первичного ключа
+через iterator(), так что в памяти не бывает больше одного осколка. Каждый
+файл пишется во временный и подменяется атомарно, рядом кладётся сжатая
+копия .gz; осколки, которые больше не нужны, удаляются. Готовые файлы
+отдаёт views.sitemap.
+"""
+import os
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from . import links
+from .models import ArchivedPost, Group, Post
+from .storage import _compress
+
+
+User = get_user_model()
+
+SHARD_SIZE = 50000
+INDEX_NAME = 'sitemap.xml'
+NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def _posts(after, size):
+    return Post.objects.filter(pk__gt=after).order_by('pk').values_list(
+        'pk', 'author__username', 'pub_date'
+    )[:size].iterator()
+
+
+def _archived_posts(after, size):
+    return ArchivedPost.objects.filter(pk__gt=after).order_by(
+        'pk'
+    ).values_list('pk', 'author__username', 'pub_date')[:size].iterator()
+
+
+def _profiles(after, size):
+    return User.objects.filter(pk__gt=after).order_by('pk').values_list(
+        'pk', 'username'
+    )[:size].iterator()
+
+
+def _groups(after, size):
+    return Group.objects.filter(pk__gt=after).order_by('pk').values_list(
+        'pk', 'slug'
+    )[:size].iterator()
+
+
+def _post_location(row):
+    return reverse('post', args=[row[1], row[0]]), row[2]
+
+
+SECTIONS = (
+    ('posts', _posts, _post_location),
+    ('archive', _archived_posts, _post_location),
+    ('profiles', _profiles, lambda row: (
+        reverse('profile', args=[row[1]]), None
+    )),
+    ('groups', _groups, lambda row: (
+        reverse('group', args=[row[1]]), None
+    )),
+)
+
+
+def _lastmod(value):
+    return timezone.localtime(value).date().isoformat()
+
+
+def _write(root, name, lines):
+    path = os.path.join(root, name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        for line in lines:
+            f.write(line)
+    os.replace(path + '.tmp', path)
+    _compress(path)
+    return name
+
+
+def _shard(base_url, rows, location, state):
+    yield '<urlset xmlns="{}">\n'.format(NAMESPACE)
+    for row in rows:
+        state['after'] = row[0]
+        url, lastmod = location(row)
+        yield '<url><loc>{}</loc>{}</url>\n'.format(
+            escape(base_url + url),
+            '<lastmod>{}</lastmod>'.format(_lastmod(lastmod))
+            if lastmod else ''
+        )
+    yield '</urlset>\n'
+
+
+def build(root=None, shard_size=SHARD_SIZE):
+    """Пересобирает карту сайта, возвращает имена записанных файлов."""
+    root = root or settings.SITEMAP_ROOT
+    os.makedirs(root, exist_ok=True)
+    base_url = links.base_url()
+    written = []
+    for section, fetch, location in SECTIONS:
+        state, number = {'after': 0}, 0
+        while True:
+            rows = fetch(state['after'], shard_size)
+            first = next(rows, None)
+            if first is None:
+                break
+            number += 1
+            written.append(_write(
+                root,
+                'sitemap-{}-{}.xml'.format(section, number),
+                _shard(base_url, chain([first], rows), location, state)
+            ))
+
+    now = _lastmod(timezone.now())
+    _write(root, INDEX_NAME, [
+        '<sitemapindex xmlns="{}">\n'.format(NAMESPACE),
+        *(
+            '<sitemap><loc>{}</loc><lastmod>{}</lastmod></sitemap>\n'.format(
+                escape('{}/{}'.format(base_url, name)), now
+            )
+            for name in written
+        ),
+        '</sitemapindex>\n',
+    ])
+
+    keep = set(written) | {INDEX_NAME}
+    for entry in os.scandir(root):
+        name = entry.name
+        for suffix in ('.gz', '.br'):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+        if name.startswith('sitemap') and name not in keep:
+            os.unlink(entry.path)
+    return [INDEX_NAME] + written
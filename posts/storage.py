@@ -0,0 +1,153 @@
+"""Хранилище изображений с адресацией по содержимому.
+
+Файлы из HASHED_DIRS сохраняются под именем sha256 от содержимого:
+posts/ab/cd/abcd...ef.jpg. Хеш считается во время потоковой записи во
+временный файл, и если такой файл уже есть, копия не создаётся. Миниатюры sorl
+строятся по имени исходника, поэтому тоже общие для всех копий.
+
+Сколько записей ссылается на файл, хранит ImageBlob. Счётчик ведут сигналы
+Post, а cleanup.delete_image удаляет файл только когда ссылок не осталось.
+
+CompressedManifestStaticFilesStorage — хранилище статики для collectstatic:
+имена с хешем содержимого плюс заранее сжатые копии .gz и .br рядом.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+
+from .models import ImageBlob
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+HASHED_DIRS = ('posts',)
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.json', '.txt', '.xml', '.html',
+    '.eot', '.ttf', '.otf',
+)
+
+
+def hashed_name(directory, digest, ext):
+    return '/'.join((directory, digest[:2], digest[2:4], digest + ext))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def _is_hashed(self, name):
+        return name.replace('\\', '/').split('/', 1)[0] in HASHED_DIRS
+
+    def get_available_name(self, name, max_length=None):
+        if self._is_hashed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not self._is_hashed(name):
+            return super()._save(name, content)
+
+        directory, filename = os.path.split(name.replace('\\', '/'))
+        ext = os.path.splitext(filename)[1].lower()
+        tmp_dir = self.path(directory)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            name = hashed_name(directory, digest.hexdigest(), ext)
+            full_path = self.path(name)
+            try:
+                # Свежий mtime не даёт gc_media удалить файл, на который
+                # только что появилась новая ссылка.
+                os.utime(full_path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+            else:
+                os.unlink(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return name
+
+
+def retain(name):
+    if not name:
+        return
+    updated = ImageBlob.objects.filter(name=name).update(
+        refcount=F('refcount') + 1
+    )
+    if not updated:
+        ImageBlob.objects.get_or_create(name=name)
+        ImageBlob.objects.filter(name=name).update(
+            refcount=F('refcount') + 1
+        )
+
+
+def release(name):
+    if name:
+        ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1
+        )
+
+
+def is_referenced(name):
+    return ImageBlob.objects.filter(name=name, refcount__gt=0).exists()
+
+
+def _compress(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    variants = [('.gz', lambda raw: gzip.compress(raw, 9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress))
+    for suffix, compress in variants:
+        packed = compress(data)
+        if len(packed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(packed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешами в именах и предварительно сжатыми копиями.
+
+    Если файла нет в манифесте, url() возвращает исходное имя вместо ошибки:
+    такие ссылки находит команда check_static.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.lower().endswith(COMPRESSIBLE) and self.exists(name):
+                _compress(self.path(name))
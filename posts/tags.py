@@ -0,0 +1,153 @@
+"""Хештеги и упоминания.
+
+Текст записи разбирается только при сохранении и только если он изменился
+(сигнал post_save сравнивает с _loaded_values). Хештеги попадают в Tag и
+TaggedPost, упоминания существующих пользователей — в Mention; обновляется
+лишь разница со старым набором. Страница хештега листается курсором по id
+записи через индекс (tag, post), без OFFSET.
+
+Письма об упоминаниях копит буфер (posts.batching) и отправляет пачкой из
+фонового потока раз в MENTION_NOTIFY_INTERVAL секунд, так что сохранение
+записи не ждёт почтовый сервер.
+
+Записи, сохранённые до появления индекса, добавляет команда index_tags;
+писем об упоминаниях она не отправляет.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.urls import reverse
+
+from . import links
+from .batching import Buffer
+from .models import Mention, Post, Tag, TaggedPost
+
+
+User = get_user_model()
+
+HASHTAG_RE = re.compile(r'(?<![\w&])#(\w{1,100})')
+MENTION_RE = re.compile(r'(?<![\w@])@(\w[\w.+-]{0,149})')
+PAGE_SIZE = 10
+
+
+def parse(text):
+    tags = {name.lower() for name in HASHTAG_RE.findall(text or '')}
+    mentions = {name.rstrip('.') for name in MENTION_RE.findall(text or '')}
+    return tags, mentions
+
+
+def index_post(post, notify=True):
+    tags, usernames = parse(post.text)
+    _index_tags(post, tags)
+    added = _index_mentions(post, usernames)
+    if added and notify:
+        transaction.on_commit(
+            lambda: [notifications.add((post.pk, pk)) for pk in added]
+        )
+
+
+def _index_tags(post, names):
+    current = dict(
+        TaggedPost.objects.filter(post=post).values_list('tag__name', 'pk')
+    )
+    removed = [pk for name, pk in current.items() if name not in names]
+    if removed:
+        TaggedPost.objects.filter(pk__in=removed).delete()
+    new = names - set(current)
+    if new:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in new], ignore_conflicts=True
+        )
+        TaggedPost.objects.bulk_create([
+            TaggedPost(tag_id=tag_id, post=post)
+            for tag_id in Tag.objects.filter(name__in=new).values_list(
+                'pk', flat=True
+            )
+        ])
+
+
+def _index_mentions(post, usernames):
+    users = set(User.objects.filter(username__in=usernames).exclude(
+        pk=post.author_id
+    ).values_list('pk', flat=True)) if usernames else set()
+    current = set(
+        Mention.objects.filter(post=post).values_list('user_id', flat=True)
+    )
+    if current - users:
+        Mention.objects.filter(post=post, user_id__in=current - users).delete()
+    added = users - current
+    if added:
+        Mention.objects.bulk_create(
+            [Mention(post=post, user_id=pk) for pk in added]
+        )
+    return added
+
+
+def reindex(batch_size=500):
+    """Индексирует все записи диапазонами pk, возвращает их число."""
+    queryset = Post.objects.only('pk', 'text', 'author_id').order_by('pk')
+    last, count = 0, 0
+    while True:
+        posts = list(queryset.filter(pk__gt=last)[:batch_size])
+        if not posts:
+            return count
+        with transaction.atomic():
+            for post in posts:
+                index_post(post, notify=False)
+        last = posts[-1].pk
+        count += len(posts)
+
+
+def tagged_posts(tag, before=None, size=PAGE_SIZE):
+    """Записи с хештегом, новые первыми; before — курсор (id записи)."""
+    tagged = TaggedPost.objects.filter(
+        tag=tag, post__is_deleted=False
+    ).select_related('post__author', 'post__group').order_by('-post_id')
+    if before is not None:
+        tagged = tagged.filter(post_id__lt=before)
+    posts = [item.post for item in tagged[:size + 1]]
+    return posts[:size], len(posts) > size
+
+
+class MentionBuffer(Buffer):
+    def empty(self):
+        return []
+
+    def add_to(self, data, item):
+        data.append(item)
+
+    def combine(self, older, newer):
+        return older + newer
+
+    def interval(self):
+        return getattr(settings, 'MENTION_NOTIFY_INTERVAL', 5)
+
+    def write(self, pairs):
+        mentions = Mention.objects.filter(
+            post_id__in={post_id for post_id, user_id in pairs},
+            user_id__in={user_id for post_id, user_id in pairs},
+        ).select_related('post__author', 'user')
+        wanted = set(pairs)
+        base_url = links.base_url()
+        messages = [
+            (
+                'Вас упомянул {}'.format(mention.post.author.username),
+                '{}\n\n{}{}'.format(mention.post.text, base_url, reverse(
+                    'post',
+                    args=[mention.post.author.username, mention.post_id]
+                )),
+                settings.DEFAULT_FROM_EMAIL,
+                [mention.user.email],
+            )
+            for mention in mentions
+            if (mention.post_id, mention.user_id) in wanted
+            and mention.user.email
+        ]
+        if messages:
+            send_mass_mail(messages, fail_silently=True)
+
+
+notifications = MentionBuffer()
@@ -0,0 +1,68 @@
+"""Прогрев и проверка шаблонов.
+
+warm компилирует все шаблоны, которые видят загрузчики; с cached.Loader они
+остаются в памяти процесса. Её вызывают команда warm_templates и точки входа
+yatube.wsgi и yatube.asgi при WARM_TEMPLATES: на старте сервера ошибки
+пишутся в лог, а не прерывают запуск.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def loader_dirs(loaders):
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            yield from loader_dirs(loader.loaders)
+        elif hasattr(loader, 'get_dirs'):
+            yield from loader.get_dirs()
+
+
+def template_files(engine):
+    """(каталог, путь к файлу) для всех каталогов, которые видят загрузчики."""
+    directories = []
+    for directory in loader_dirs(engine.engine.template_loaders):
+        if directory not in directories:
+            directories.append(directory)
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(TEMPLATE_EXTENSIONS):
+                    yield directory, os.path.join(root, filename)
+
+
+def template_names(engine):
+    for directory, path in template_files(engine):
+        yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm():
+    """Компилирует все шаблоны, возвращает (число, [(имя, ошибка)])."""
+    loaded = 0
+    errors = []
+    for engine in engines.all():
+        for name in sorted(set(template_names(engine))):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors.append((name, error))
+            else:
+                loaded += 1
+    return loaded, errors
+
+
+def warm_on_startup():
+    try:
+        loaded, errors = warm()
+    except Exception:
+        logger.exception('Template warm-up failed')
+        return
+    for name, error in errors:
+        logger.error('Template %s: %s', name, error)
+    logger.info('Templates warmed: %d, errors: %d', loaded, len(errors))
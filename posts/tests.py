@@ -1,11 +1,31 @@
+from django.core.management import call_command
 from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.core.files.base import ContentFile
 from django.core.files.images import ImageFile
-from .models import Post, Group, Follow
+from . import (
+    cleanup, events, follow_graph, group_stats, recommendations, versions
+)
+from .models import (
+    ArchivedComment, ArchivedPost, Post, Group, GroupStats, Comment, Follow,
+    ImageBlob, Like, Mention, Recommendation, Tag
+)
+import asyncio
+import os
+import re
+import shutil
 import tempfile
 
 
+CSRF_TOKEN_RE = re.compile(rb'name="csrfmiddlewaretoken" value="\w+"')
+
+
+def strip_csrf(content):
+    """Токен CSRF маскируется заново при каждой отрисовке."""
+    return CSRF_TOKEN_RE.sub(b'', content)
+
+
 DUMMY_CACHE = {
             'default': {
                 'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
@@ -54,7 +74,9 @@ class ProfileTest(TestCase):
         )
         expected_response = self.client_auth.get(reverse('index'))
         post = Post.objects.get(author=self.user, text='test post')
-        self.assertEqual(response.content, expected_response.content)
+        self.assertEqual(
+            strip_csrf(response.content), strip_csrf(expected_response.content)
+        )
         self.assertIn(post, Post.objects.all())
 
     def test_new_post_unauthorized(self):
@@ -204,3 +226,1536 @@ class ProfileTest(TestCase):
         response = self.client_auth.get(reverse('index'))
         self.assertNotContains(response, 'test post')
         self.assertEqual(Post.objects.count(), 2)
+
+
+class FollowGraphTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice')
+        self.bob = User.objects.create_user(username='bob')
+        self.carol = User.objects.create_user(username='carol')
+        Follow.objects.create(user=self.alice, author=self.bob)
+        Follow.objects.create(user=self.bob, author=self.alice)
+        Follow.objects.create(user=self.carol, author=self.bob)
+
+    def test_adjacency(self):
+        self.assertEqual(
+            list(follow_graph.followers(self.bob.id)),
+            sorted([self.alice.id, self.carol.id])
+        )
+        self.assertEqual(
+            list(follow_graph.following(self.alice.id)), [self.bob.id]
+        )
+        self.assertTrue(follow_graph.is_following(self.carol.id, self.bob.id))
+        self.assertFalse(
+            follow_graph.is_following(self.bob.id, self.carol.id)
+        )
+        self.assertTrue(follow_graph.is_mutual(self.alice.id, self.bob.id))
+        self.assertEqual(follow_graph.mutual(self.bob.id), [self.alice.id])
+
+    def test_cached_answers_without_queries(self):
+        follow_graph.followers(self.bob.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(follow_graph.followers_count(self.bob.id), 2)
+
+    def test_invalidated_on_follow_change(self):
+        self.assertEqual(follow_graph.followers_count(self.bob.id), 2)
+        Follow.objects.filter(user=self.carol).delete()
+        self.assertEqual(follow_graph.followers_count(self.bob.id), 1)
+        Follow.objects.create(user=self.carol, author=self.alice)
+        self.assertTrue(
+            follow_graph.is_following(self.carol.id, self.alice.id)
+        )
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'follow-graph-test',
+}})
+class SharedFollowGraphTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        follow_graph.reset_local()
+        self.addCleanup(follow_graph.reset_local)
+        self.alice = User.objects.create_user(username='alice')
+        self.bob = User.objects.create_user(username='bob')
+        self.carol = User.objects.create_user(username='carol')
+        Follow.objects.create(user=self.alice, author=self.bob)
+
+    def test_change_keeps_other_lists_cached(self):
+        follow_graph.followers(self.bob.id)
+        Follow.objects.create(user=self.carol, author=self.alice)
+        follow_graph.reset_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(follow_graph.followers_count(self.bob.id), 1)
+        self.assertEqual(follow_graph.followers_count(self.alice.id), 1)
+
+    def test_evicted_version_does_not_revive_stale_entry(self):
+        from django.core.cache import cache
+        self.assertEqual(follow_graph.followers_count(self.bob.id), 1)
+        Follow.objects.create(user=self.carol, author=self.bob)
+        cache.delete(follow_graph._version_key(
+            follow_graph.FOLLOWERS, self.bob.id
+        ))
+        follow_graph.reset_local()
+        self.assertEqual(follow_graph.followers_count(self.bob.id), 2)
+
+
+class RecommendationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.friend = User.objects.create_user(username='friend')
+        self.star = User.objects.create_user(username='star')
+        self.neighbour = User.objects.create_user(username='neighbour')
+        self.group = Group.objects.create(title='group', slug='group')
+        Follow.objects.create(user=self.user, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.star)
+        Post.objects.create(
+            text='mine', author=self.user, group=self.group
+        )
+        Post.objects.create(
+            text='theirs', author=self.neighbour, group=self.group
+        )
+
+    def test_build(self):
+        stats = recommendations.build()
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(
+            Recommendation.objects.get(user=self.user).author_ids(),
+            [self.star.id, self.neighbour.id]
+        )
+        self.assertEqual(
+            recommendations.build(),
+            {'created': 0, 'updated': 0, 'deleted': 0}
+        )
+
+    def test_group_authors_deduplicated_in_sql(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            recommendations.load_graph()
+        sql = queries[-1]['sql']
+        self.assertIn('DISTINCT', sql)
+        self.assertNotIn('pub_date', sql)
+
+    def test_followed_authors_hidden(self):
+        recommendations.build()
+        Follow.objects.create(user=self.user, author=self.star)
+        self.assertEqual(
+            recommendations.suggested_authors(self.user), [self.neighbour]
+        )
+
+    def test_follow_page_block(self):
+        recommendations.build()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('follow_index'))
+        self.assertContains(response, 'Кого почитать')
+        self.assertContains(response, self.star.username)
+
+
+class GroupStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer')
+        self.other = User.objects.create_user(username='other')
+        self.group = Group.objects.create(title='first', slug='first')
+        self.second = Group.objects.create(title='second', slug='second')
+
+    def assert_stats(self, group, post_count, author_count):
+        stats = GroupStats.objects.get(group=group)
+        self.assertEqual(stats.post_count, post_count)
+        self.assertEqual(stats.author_count, author_count)
+
+    def test_counters_follow_posts(self):
+        post = Post.objects.create(
+            text='one', author=self.user, group=self.group
+        )
+        Post.objects.create(text='two', author=self.user, group=self.group)
+        Post.objects.create(text='three', author=self.other, group=self.group)
+        self.assert_stats(self.group, 3, 2)
+        self.assertIsNotNone(
+            GroupStats.objects.get(group=self.group).last_post
+        )
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.second
+        post.save()
+        self.assert_stats(self.group, 2, 2)
+        self.assert_stats(self.second, 1, 1)
+
+        Post.objects.filter(author=self.other).delete()
+        self.assert_stats(self.group, 1, 1)
+
+    def test_missing_row_built_from_existing_posts(self):
+        Post.objects.create(text='one', author=self.user, group=self.group)
+        Post.objects.create(text='two', author=self.other, group=self.group)
+        GroupStats.objects.all().delete()
+        Post.objects.create(text='three', author=self.user, group=self.group)
+        self.assert_stats(self.group, 3, 2)
+        self.assertEqual(GroupStats.objects.get(group=self.group).velocity, 3)
+
+    def test_velocity_follows_posts(self):
+        post = Post.objects.create(
+            text='one', author=self.user, group=self.group
+        )
+        Post.objects.create(text='two', author=self.user, group=self.group)
+        self.assertEqual(GroupStats.objects.get(group=self.group).velocity, 2)
+        self.assertEqual(group_stats.trending(), [self.group])
+        post.tombstone()
+        self.assertEqual(GroupStats.objects.get(group=self.group).velocity, 1)
+
+    def test_migration_backfills_existing_groups(self):
+        from importlib import import_module
+        from django.apps import apps
+        Post.objects.create(text='one', author=self.user, group=self.group)
+        GroupStats.objects.all().delete()
+        migration = import_module('posts.migrations.0019_backfill_group_stats')
+        migration.backfill(apps, None)
+        self.assert_stats(self.group, 1, 1)
+        self.assert_stats(self.second, 0, 0)
+
+    def test_rebuild_and_trending(self):
+        Post.objects.create(text='one', author=self.user, group=self.second)
+        GroupStats.objects.all().delete()
+        self.assertEqual(group_stats.rebuild(), 2)
+        self.assert_stats(self.second, 1, 1)
+        self.assertEqual(group_stats.trending(), [self.second])
+
+    def test_archived_posts_still_counted(self):
+        from datetime import timedelta
+        from importlib import import_module
+        from django.apps import apps
+        from django.utils import timezone
+        from . import archive
+        old = Post.objects.create(
+            text='old', author=self.other, group=self.group
+        )
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        Post.objects.create(text='new', author=self.user, group=self.group)
+        archive.archive(days=365)
+        self.assert_stats(self.group, 2, 2)
+
+        GroupStats.objects.all().delete()
+        group_stats.rebuild()
+        self.assert_stats(self.group, 2, 2)
+        GroupStats.objects.all().delete()
+        migration = import_module('posts.migrations.0019_backfill_group_stats')
+        migration.backfill(apps, None)
+        self.assert_stats(self.group, 2, 2)
+        GroupStats.objects.all().delete()
+        Post.objects.create(text='newer', author=self.other, group=self.group)
+        self.assert_stats(self.group, 3, 2)
+
+        ArchivedPost.objects.get(pk=old.pk).delete()
+        self.assert_stats(self.group, 2, 2)
+
+
+@override_settings(CACHES=DUMMY_CACHE)
+class SoftDeleteTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='group', slug='group')
+        self.post = Post.objects.create(
+            text='Doomed post', author=self.author, group=self.group
+        )
+        for number in range(5):
+            Comment.objects.create(
+                post=self.post, author=self.reader, text=str(number)
+            )
+        self.client.force_login(self.author)
+
+    def test_delete_tombstones_post(self):
+        self.client.get(
+            reverse('post_delete', args=[self.author.username, self.post.id])
+        )
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertEqual(Comment.objects.count(), 5)
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).post_count, 0
+        )
+        self.assertNotContains(self.client.get(reverse('index')), 'Doomed')
+        response = self.client.get(
+            reverse('post', args=[self.author.username, self.post.id])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_by_other_user(self):
+        self.client.force_login(self.reader)
+        self.client.get(
+            reverse('post_delete', args=[self.author.username, self.post.id])
+        )
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_purge(self):
+        self.post.tombstone()
+        stats = cleanup.purge_deleted(batch_size=2)
+        self.assertEqual(stats, {'posts': 1, 'comments': 5, 'images': 0})
+        self.assertFalse(Post.all_objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).post_count, 0
+        )
+
+
+class MediaGarbageCollectorTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.media_root, 'posts', 'old'))
+        for name in ('used.jpg', 'orphan.jpg', 'old/orphan.jpg'):
+            with open(os.path.join(self.media_root, 'posts', name), 'wb') as f:
+                f.write(b'data')
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='post', author=author, image='posts/used.jpg')
+
+    def test_dry_run(self):
+        stats = cleanup.collect_orphans(dry_run=True, min_age=0)
+        self.assertEqual(stats['scanned'], 3)
+        self.assertEqual(stats['orphans'], 2)
+        self.assertEqual(stats['bytes'], 8)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.media_root, 'posts/orphan.jpg'))
+        )
+
+    def test_collect(self):
+        cleanup.collect_orphans(batch_size=1, min_age=0)
+        remaining = [name for name, size, mtime in cleanup.scan_files('posts')]
+        self.assertEqual(remaining, ['posts/used.jpg'])
+
+    def test_recent_files_kept(self):
+        stats = cleanup.collect_orphans()
+        self.assertEqual(stats['orphans'], 0)
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.author = User.objects.create_user(username='author')
+
+    def create_post(self, data, name='meme.JPG'):
+        post = Post(text='meme', author=self.author)
+        post.image.save(name, ContentFile(data))
+        return post
+
+    def test_same_content_stored_once(self):
+        first = self.create_post(b'same bytes')
+        second = self.create_post(b'same bytes', name='copy.jpg')
+        third = self.create_post(b'other bytes')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, third.image.name)
+        self.assertRegex(first.image.name, r'^posts/\w\w/\w\w/\w{64}\.jpg$')
+        blob = ImageBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.refcount, 2)
+        files = list(cleanup.scan_files('posts'))
+        self.assertEqual(len(files), 2)
+
+    def test_duplicate_upload_refreshes_mtime(self):
+        import time
+        path = self.create_post(b'same bytes').image.path
+        os.utime(path, (0, 0))
+        self.create_post(b'same bytes')
+        self.assertGreater(os.stat(path).st_mtime, time.time() - 60)
+        self.assertEqual(cleanup.collect_orphans()['orphans'], 0)
+
+    def test_shared_file_kept_until_last_reference(self):
+        first = self.create_post(b'same bytes')
+        second = self.create_post(b'same bytes')
+        path = first.image.path
+        first.tombstone()
+        cleanup.purge_deleted()
+        self.assertTrue(os.path.exists(path))
+        second.tombstone()
+        self.assertEqual(cleanup.purge_deleted()['images'], 1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_migration_counts_shared_images(self):
+        from importlib import import_module
+        from django.apps import apps
+        first = self.create_post(b'same bytes')
+        self.create_post(b'same bytes')
+        ImageBlob.objects.all().delete()
+        migration = import_module('posts.migrations.0011_imageblob')
+        migration.count_references(apps, None)
+        self.assertEqual(
+            ImageBlob.objects.get(name=first.image.name).refcount, 2
+        )
+
+
+class MediaServingTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.media_root, 'posts'))
+        with open(os.path.join(self.media_root, 'posts', 'a.jpg'), 'wb') as f:
+            f.write(b'0123456789')
+        self.url = '/media/posts/a.jpg'
+
+    def test_full_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected/')
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected/posts/a.jpg'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_forbidden_paths(self):
+        for path in ('/media/../manage.py', '/media/other/a.jpg',
+                     '/media/posts/.a.part', '/media/posts/missing.jpg'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+class StaticPipelineTest(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.static_root)
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as f:
+            f.write('body { color: red; }\n' * 50)
+        override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[self.source],
+            SERVE_STATIC=True,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        with self.modify_settings(INSTALLED_APPS={'remove': [
+            'django.contrib.admin', 'posts', 'users', 'sorl.thumbnail'
+        ]}):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+    def hashed_css(self):
+        return [
+            name for name in os.listdir(
+                os.path.join(self.static_root, 'css')
+            ) if name.startswith('site.') and name.endswith('.css')
+            and name != 'site.css'
+        ][0]
+
+    def test_hashed_and_precompressed(self):
+        hashed = self.hashed_css()
+        self.assertTrue(os.path.exists(
+            os.path.join(self.static_root, 'css', hashed + '.gz')
+        ))
+        response = self.client.get(
+            '/static/css/' + hashed, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get('/static/css/site.css')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+
+class AsgiAdapterTest(TestCase):
+    def call(self, scope, body=b''):
+        from yatube.asgi import WsgiToAsgi
+
+        def wsgi_app(environ, start_response):
+            start_response('201 Created', [('X-Path', environ['PATH_INFO'])])
+            return [environ['wsgi.input'].read(), b'!']
+
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(WsgiToAsgi(wsgi_app, max_workers=1)(scope, receive, send))
+        return sent
+
+    def test_request_roundtrip(self):
+        sent = self.call({
+            'type': 'http',
+            'method': 'POST',
+            'path': '/hello/',
+            'headers': [(b'content-type', b'text/plain')],
+        }, body=b'hello')
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'x-path', b'/hello/'), sent[0]['headers'])
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in sent[1:]),
+            b'hello!'
+        )
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_repeated_headers_joined(self):
+        from django.http.cookie import parse_cookie
+        from yatube.asgi import WsgiToAsgi
+        environ = WsgiToAsgi(None, max_workers=1).build_environ({
+            'type': 'http',
+            'method': 'GET',
+            'path': '/',
+            'headers': [
+                (b'cookie', b'sessionid=abc'),
+                (b'cookie', b'csrftoken=xyz'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+            ],
+        }, None)
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(
+            parse_cookie(environ['HTTP_COOKIE']),
+            {'sessionid': 'abc', 'csrftoken': 'xyz'}
+        )
+
+    def test_slow_client_does_not_hold_thread(self):
+        import threading
+        from yatube.asgi import WsgiToAsgi
+        finished = threading.Event()
+
+        def wsgi_app(environ, start_response):
+            start_response('200 OK', [])
+            yield from [b'a', b'b', b'c']
+            finished.set()
+
+        released = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            for _ in range(100):
+                if finished.is_set():
+                    break
+                await asyncio.sleep(0.01)
+            released.append(finished.is_set())
+
+        asyncio.run(WsgiToAsgi(wsgi_app, max_workers=1)(
+            {'type': 'http', 'method': 'GET', 'path': '/'}, receive, send
+        ))
+        self.assertTrue(released[0])
+
+
+class PostEventsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='group', slug='group')
+        self.old = Post.objects.create(text='old', author=self.author)
+
+    def test_polling_fallback(self):
+        Post.objects.create(text='new', author=self.author, group=self.group)
+        last = Post.objects.create(text='newer', author=self.author)
+        response = self.client.get(
+            reverse('post_events'), {'last_id': self.old.id}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn(
+            'id: {}\nevent: posts\ndata: {{"count": 2}}'.format(last.id),
+            response.content.decode()
+        )
+        response = self.client.get(
+            reverse('post_events'),
+            {'group': self.group.id},
+            HTTP_LAST_EVENT_ID=str(last.id)
+        )
+        self.assertNotIn('event:', response.content.decode())
+
+    def test_stream(self):
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(0.05)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async def run():
+            task = asyncio.ensure_future(events.stream(
+                {'type': 'http', 'query_string': b'group=7&last_id=10'},
+                receive, send
+            ))
+            await asyncio.sleep(0.01)
+            events.broker.publish({'id': 11, 'author': 1, 'group': 7})
+            events.broker.publish({'id': 12, 'author': 1, 'group': 8})
+            await task
+
+        asyncio.run(run())
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn(b'id: 11\n', body)
+        self.assertNotIn(b'id: 12\n', body)
+
+
+class WarmTemplatesTest(TestCase):
+    def test_all_templates_compile(self):
+        from .templates_warmup import warm
+        loaded, errors = warm()
+        self.assertGreater(loaded, 0)
+        self.assertEqual(errors, [])
+
+    def test_syntax_error_reported(self):
+        from .templates_warmup import warm, warm_on_startup
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'broken.html'), 'w') as f:
+            f.write('{% if %}')
+        templates = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [directory],
+            'OPTIONS': {'loaders': [(
+                'django.template.loaders.cached.Loader',
+                ['django.template.loaders.filesystem.Loader'],
+            )]},
+        }]
+        with override_settings(TEMPLATES=templates):
+            loaded, errors = warm()
+            with self.assertLogs('posts.templates_warmup', 'ERROR') as logs:
+                warm_on_startup()
+        self.assertIn('broken.html', [name for name, error in errors])
+        self.assertIn('broken.html', logs.output[0])
+
+
+class GZipMiddlewareTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='gzip', password='pw')
+        for number in range(5):
+            Post.objects.create(text='Запись ' * 50 + str(number),
+                                author=self.user)
+
+    @override_settings(GZIP_RESPONSES=True)
+    def test_html_compressed(self):
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_disabled_by_default(self):
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(GZIP_RESPONSES=True)
+    def test_event_stream_untouched(self):
+        response = self.client.get(
+            reverse('post_events'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class SqlitePragmaTest(TestCase):
+    def test_pragmas_applied(self):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class BenchmarkDbTest(TestCase):
+    def test_rows_removed_and_rerun_possible(self):
+        for _ in range(2):
+            call_command(
+                'benchmark_db', '--threads=1', '--seconds=0.1',
+                stdout=open(os.devnull, 'w')
+            )
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Post.all_objects.exists())
+
+    def test_rows_removed_after_interrupt(self):
+        from unittest import mock
+        start = mock.patch(
+            'threading.Thread.start', side_effect=KeyboardInterrupt
+        )
+        with start, self.assertRaises(KeyboardInterrupt):
+            call_command('benchmark_db', stdout=open(os.devnull, 'w'))
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Post.all_objects.exists())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        from yatube import routers
+        self.routers = routers
+        self.router = routers.ReplicaRouter()
+        self.addCleanup(routers.finish_request)
+
+    def test_outside_request_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_read_only_request_uses_replica(self):
+        self.routers.start_request(pinned=False)
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+
+    def test_write_pins_rest_of_request(self):
+        self.routers.start_request(pinned=False)
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertTrue(self.routers.finish_request())
+
+    def test_pinned_request_uses_primary(self):
+        self.routers.start_request(pinned=True)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_primary_block_overrides_replica(self):
+        self.routers.start_request(pinned=False)
+        with self.routers.primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+
+    def test_shared_caches_filled_from_primary(self):
+        author = User.objects.create_user(username='writer')
+        follow_graph.reset_local()
+        self.routers.start_request(pinned=False)
+        self.assertEqual(follow_graph.followers_count(author.id), 0)
+
+    def test_database_cache_uses_primary_without_pinning(self):
+        from django.core.cache.backends.db import DatabaseCache
+        cache_model = DatabaseCache('yatube_cache', {}).cache_model_class
+        self.routers.start_request(pinned=False)
+        self.assertEqual(self.router.db_for_read(cache_model), 'default')
+        self.assertEqual(self.router.db_for_write(cache_model), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+        self.assertFalse(self.routers.finish_request())
+
+
+class ReplicaPinMiddlewareTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.author = User.objects.create_user(username='writer')
+        self.client.force_login(self.user)
+
+    def test_write_sets_pin_cookie(self):
+        response = self.client.get(
+            reverse('profile_follow', args=[self.author.username])
+        )
+        self.assertIn('db_primary', response.cookies)
+
+    def test_read_does_not_pin(self):
+        response = self.client.get('/')
+        self.assertNotIn('db_primary', response.cookies)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    }})
+    def test_cache_fill_does_not_pin(self):
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from yatube.middleware import ReplicaPinMiddleware
+        call_command('createcachetable', verbosity=0)
+
+        def view(request):
+            cache.set('key', 'value')
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(view)(RequestFactory().get('/'))
+        self.assertNotIn('db_primary', response.cookies)
+        self.assertEqual(cache.get('key'), 'value')
+
+
+@override_settings(COMMENT_QUEUE=True, COMMENT_FLUSH_INTERVAL=0)
+class CommentQueueTest(TestCase):
+    def setUp(self):
+        from . import comment_queue
+        self.queue = comment_queue
+        self.addCleanup(comment_queue.buffer.flush)
+        self.client = Client()
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.author = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(text='Запись', author=self.author)
+        self.client.force_login(self.user)
+        self.url = reverse('add_comment', args=['writer', self.post.id])
+
+    def test_comment_visible_to_author_before_flush(self):
+        self.client.post(self.url, {'text': 'Очередь'})
+        self.assertFalse(Comment.objects.exists())
+        url = reverse('post', args=['writer', self.post.id])
+        self.assertContains(self.client.get(url), 'Очередь')
+        response = Client().get(url)
+        self.assertNotContains(response, 'Очередь')
+
+    def test_flush_inserts_batch(self):
+        for number in range(3):
+            self.client.post(self.url, {'text': 'Текст {}'.format(number)})
+        with self.assertNumQueries(5):
+            self.assertEqual(self.queue.flush(), 3)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 3)
+        self.assertFalse(self.queue.pending_for(self.post.id, self.user.id))
+
+    def test_comments_on_removed_post_dropped(self):
+        self.client.post(self.url, {'text': 'Потерянный'})
+        Post.all_objects.filter(pk=self.post.pk).delete()
+        self.queue.flush()
+        self.assertFalse(Comment.objects.exists())
+
+    def test_comments_of_removed_author_dropped(self):
+        self.client.post(self.url, {'text': 'Потерянный'})
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self.queue.flush(), 1)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(self.queue.buffer.pending())
+
+    def test_created_kept_from_submit(self):
+        self.client.post(self.url, {'text': 'Время'})
+        created = self.queue.buffer.pending()[0].created
+        self.queue.flush()
+        self.assertEqual(Comment.objects.get().created, created)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'comment-queue-test',
+    }})
+    def test_pending_visible_from_other_process(self):
+        self.client.post(self.url, {'text': 'Другой процесс'})
+        comment = self.queue.buffer.pending()[0]
+        self.queue.buffer._data = self.queue.buffer.empty()
+        url = reverse('post', args=['writer', self.post.id])
+        self.assertContains(self.client.get(url), 'Другой процесс')
+        self.queue._insert([comment])
+        self.assertFalse(self.queue.pending_for(self.post.id, self.user.id))
+        response = self.client.get(url)
+        self.assertContains(response, 'Другой процесс', count=1)
+
+    def test_durability_warning(self):
+        self.assertEqual(
+            [message.id for message in self.queue.check_durability(None)],
+            ['posts.W001']
+        )
+
+
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pw'
+        )
+        self.client.force_login(self.admin)
+        group = Group.objects.create(title='Группа', slug='group')
+        for number in range(5):
+            post = Post.objects.create(
+                text='Запись {}'.format(number), author=self.admin, group=group
+            )
+            Comment.objects.create(post=post, author=self.admin, text='Да')
+
+    def changelist_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_constant_queries(self):
+        for name in ('post', 'comment', 'follow'):
+            url = reverse('admin:posts_{}_changelist'.format(name))
+            before = self.changelist_queries(url)
+            Post.objects.create(text='Ещё', author=self.admin)
+            Comment.objects.create(
+                post=Post.objects.first(), author=self.admin, text='Ещё'
+            )
+            self.assertEqual(self.changelist_queries(url), before)
+
+    def test_prefix_search(self):
+        url = reverse('admin:posts_comment_changelist')
+        response = self.client.get(url, {'q': 'adm'})
+        self.assertContains(response, '5 результатов')
+        response = self.client.get(url, {'q': 'dmin'})
+        self.assertContains(response, '0 результатов')
+        response = self.client.get(url, {'q': 'Да'})
+        self.assertContains(response, '0 результатов')
+
+    def test_prefix_search_is_case_sensitive_lookup(self):
+        from django.contrib import admin
+        for model in (Post, Group, Comment, Follow):
+            model_admin = admin.site._registry[model]
+            queryset, _ = model_admin.get_search_results(
+                None, model.objects.all(), 'adm'
+            )
+            lookups = {
+                lookup.lookup_name
+                for child in queryset.query.where.children
+                for lookup in getattr(child, 'children', [child])
+                if hasattr(lookup, 'lookup_name')
+            }
+            self.assertNotIn('istartswith', lookups)
+            self.assertIn('startswith', lookups)
+
+    def test_estimated_count(self):
+        from .admin import EstimatedCountPaginator
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.estimate(Post.objects.all()),
+                         Post.all_objects.latest('pk').pk)
+        self.assertEqual(paginator.count, 5)
+
+
+class GroupChoicesTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='writer', password='pw')
+        self.client.force_login(self.user)
+        for number in range(3):
+            Group.objects.create(
+                title='Сообщество {}'.format(number),
+                slug='group-{}'.format(number)
+            )
+
+    def test_choices_cached(self):
+        from .forms import PostForm
+        list(PostForm().fields['group'].choices)
+        with self.assertNumQueries(0):
+            choices = list(PostForm().fields['group'].choices)
+        self.assertEqual(len(choices), 4)
+
+    def test_new_group_invalidates(self):
+        from .forms import PostForm
+        list(PostForm().fields['group'].choices)
+        Group.objects.create(title='Новое', slug='new')
+        self.assertEqual(len(PostForm().fields['group'].choices), 5)
+
+    @override_settings(GROUP_CHOICES_LIMIT=2)
+    def test_autocomplete_past_limit(self):
+        from .forms import PostForm
+        group = Group.objects.get(slug='group-2')
+        form = PostForm({'text': 'Текст', 'group': str(group.pk)})
+        choices = list(form.fields['group'].choices)
+        self.assertEqual(choices[1:], [(group.pk, group.title)])
+        widget = form.fields['group'].widget
+        self.assertIn('data-autocomplete-url', widget.attrs)
+        self.assertTrue(form.is_valid())
+
+        response = self.client.get(
+            reverse('group_autocomplete'), {'q': 'Сообщество 1'}
+        )
+        self.assertEqual(
+            [item['title'] for item in response.json()['results']],
+            ['Сообщество 1']
+        )
+        response = self.client.get(reverse('group_autocomplete'), {'q': 'gro'})
+        self.assertEqual(len(response.json()['results']), 3)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'group-choices-test',
+    }})
+    def test_evicted_version_not_reused(self):
+        from django.core.cache import cache
+        from . import group_choices
+        from .forms import PostForm
+        list(PostForm().fields['group'].choices)
+        Group.objects.create(title='Новое', slug='new')
+        cache.delete(group_choices.VERSION_KEY)
+        group_choices._local.clear()
+        self.assertEqual(len(PostForm().fields['group'].choices), 5)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'flatpages-test',
+}})
+class CachedFlatpageTest(TestCase):
+    def setUp(self):
+        from django.contrib.flatpages.models import FlatPage
+        from django.contrib.sites.models import Site
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.page = FlatPage.objects.create(
+            url='/about-author/', title='Об авторе', content='Первый текст'
+        )
+        self.page.sites.add(Site.objects.get_current())
+
+    def test_cached_after_first_hit(self):
+        self.assertContains(self.client.get('/about-author/'), 'Первый текст')
+        with self.assertNumQueries(0):
+            response = self.client.get('/about-author/')
+        self.assertContains(response, 'Первый текст')
+
+    def test_save_invalidates(self):
+        self.client.get('/about-author/')
+        self.page.content = 'Второй текст'
+        self.page.save()
+        self.assertContains(self.client.get('/about-author/'), 'Второй текст')
+
+    def test_conditional_request(self):
+        response = self.client.get('/about-author/')
+        etag = response['ETag']
+        response = self.client.get('/about-author/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            '/about-author/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_prerender(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(FLATPAGES_PRERENDER_ROOT=directory):
+            call_command('prerender_flatpages', stdout=open(os.devnull, 'w'))
+            path = os.path.join(directory, 'about-author', 'index.html')
+            with open(path, encoding='utf-8') as f:
+                self.assertIn('Первый текст', f.read())
+            self.page.save()
+            self.assertFalse(os.path.exists(path))
+
+    def test_version_shared_and_not_reused(self):
+        from django.core.cache import cache
+        from . import flatpages
+        first = flatpages.version()
+        self.assertEqual(cache.get(flatpages.VERSION_KEY), first)
+        cache.delete(flatpages.VERSION_KEY)
+        second = flatpages.version()
+        self.assertNotEqual(second, first)
+        self.assertEqual(flatpages.version(), second)
+        flatpages.invalidate()
+        self.assertGreater(
+            versions.timestamp(flatpages.version()),
+            versions.timestamp(second)
+        )
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'feeds-test',
+}})
+class FeedsTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username='writer')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='Первая запись', author=self.author, group=self.group
+        )
+
+    def test_feeds_render(self):
+        urls = [
+            reverse('index_rss'),
+            reverse('index_atom'),
+            reverse('group_rss', args=['group']),
+            reverse('group_atom', args=['group']),
+            reverse('profile_rss', args=['writer']),
+            reverse('profile_atom', args=['writer']),
+        ]
+        for url in urls:
+            response = self.client.get(url)
+            self.assertContains(response, 'Первая запись')
+            self.assertTrue(response.has_header('ETag'))
+
+    def test_not_modified_and_cached(self):
+        url = reverse('group_rss', args=['group'])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(2):
+            self.assertContains(self.client.get(url), 'Первая запись')
+
+    def test_new_and_edited_posts_change_feed(self):
+        url = reverse('profile_rss', args=['writer'])
+        etag = self.client.get(url)['ETag']
+        self.post.text = 'Исправленная запись'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Исправленная запись')
+        Post.objects.create(text='Вторая запись', author=self.author)
+        self.assertContains(self.client.get(url), 'Вторая запись')
+
+    def test_evicted_version_not_reused(self):
+        from django.core.cache import cache
+        from . import feeds
+        url = reverse('profile_rss', args=['writer'])
+        self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        cache.delete(feeds.VERSION_KEY)
+        self.assertContains(self.client.get(url), 'Тихая правка')
+
+
+class SitemapTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(SITEMAP_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = Client()
+        self.author = User.objects.create_user(username='writer')
+        Group.objects.create(title='Группа', slug='group')
+        self.posts = [
+            Post.objects.create(text='Запись', author=self.author)
+            for _ in range(5)
+        ]
+
+    def test_shards_cover_all_posts(self):
+        from . import sitemaps
+        names = sitemaps.build(shard_size=2)
+        self.assertEqual(names[0], 'sitemap.xml')
+        post_shards = [name for name in names if '-posts-' in name]
+        self.assertEqual(len(post_shards), 3)
+        content = ''
+        for name in post_shards:
+            with open(os.path.join(self.root, name), encoding='utf-8') as f:
+                content += f.read()
+        for post in self.posts:
+            self.assertIn('/writer/{}/</loc>'.format(post.id), content)
+        with open(os.path.join(self.root, 'sitemap.xml')) as f:
+            index = f.read()
+        for name in names[1:]:
+            self.assertIn(name, index)
+
+    def test_stale_shards_removed_and_served(self):
+        from . import sitemaps
+        sitemaps.build(shard_size=2)
+        Post.all_objects.filter(pk__in=[p.pk for p in self.posts[2:]]).delete()
+        names = sitemaps.build(shard_size=2)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, 'sitemap-posts-2.xml'))
+        )
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('<sitemap>'), len(names) - 1)
+        self.assertEqual(self.client.get('/sitemap-x.xml').status_code, 404)
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+class ViewCounterTest(TestCase):
+    def setUp(self):
+        from . import view_counter
+        self.counter = view_counter
+        view_counter.buffer.flush()
+        self.client = Client()
+        self.author = User.objects.create_user(username='writer')
+        self.posts = [
+            Post.objects.create(text='Запись', author=self.author)
+            for _ in range(3)
+        ]
+
+    def test_views_buffered_and_flushed_in_batch(self):
+        first, second, third = self.posts
+        for post, views in ((first, 3), (second, 3), (third, 1)):
+            for _ in range(views):
+                self.client.get(reverse('post', args=['writer', post.id]))
+        for _ in range(2):
+            self.client.get(reverse('profile', args=['writer']))
+        first.refresh_from_db()
+        self.assertEqual(first.views, 0)
+
+        with self.assertNumQueries(7):
+            self.counter.flush()
+        views = dict(Post.objects.values_list('pk', 'views'))
+        self.assertEqual(
+            [views[post.pk] for post in self.posts], [3, 3, 1]
+        )
+        self.assertEqual(self.counter.profile_views(self.author), 2)
+        response = self.client.get(reverse('profile', args=['writer']))
+        self.assertContains(response, 'Просмотров профиля: 2')
+
+    def test_deleted_profile_does_not_block_flush(self):
+        reader = User.objects.create_user(username='reader')
+        self.counter.profile_viewed(reader)
+        self.counter.profile_viewed(self.author)
+        reader.delete()
+        self.counter.flush()
+        self.assertEqual(self.counter.profile_views(self.author), 1)
+        self.assertFalse(self.counter.buffer.pending())
+
+    def test_integrity_error_drops_batch(self):
+        from django.db import IntegrityError
+        from .batching import Buffer
+
+        class Failing(Buffer):
+            flush_at_exit = False
+
+            def empty(self):
+                return []
+
+            def add_to(self, data, item):
+                data.append(item)
+
+            def combine(self, older, newer):
+                return older + newer
+
+            def write(self, data):
+                raise IntegrityError
+
+        buffer = Failing()
+        buffer.add(1)
+        with self.assertLogs('posts.batching', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending(), [])
+
+    def test_post_view_does_not_write(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('post', args=['writer', self.posts[0].id])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith(('UPDATE', 'INSERT'))
+        ])
+
+
+class LikeTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.author = User.objects.create_user(username='writer')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='Запись', author=self.author, group=self.group
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('like_toggle', args=['writer', self.post.id])
+
+    def test_toggle_updates_count(self):
+        self.client.post(self.url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertTrue(Like.objects.filter(user=self.user).exists())
+        self.client.post(self.url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_redirects_to_next(self):
+        response = self.client.post(self.url, {'next': '/group/group/'})
+        self.assertRedirects(response, '/group/group/')
+        response = self.client.post(self.url, {'next': 'http://evil.com/'})
+        self.assertRedirects(
+            response, reverse('post', args=['writer', self.post.id])
+        )
+
+    def test_requires_post_with_csrf(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        self.assertEqual(client.post(self.url).status_code, 403)
+        self.assertFalse(Like.objects.exists())
+
+    def test_liked_state_rendered(self):
+        self.client.post(self.url)
+        response = self.client.get(reverse('group', args=['group']))
+        self.assertTrue(response.context['page'][0].liked)
+        self.assertContains(response, '&#9829; 1')
+        self.assertContains(response, 'form="like-form"')
+        self.assertContains(response, 'csrfmiddlewaretoken', count=1)
+
+    def test_constant_queries_per_page(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('group', args=['group']))
+            return len(queries)
+
+        before = count()
+        for number in range(8):
+            post = Post.objects.create(
+                text='Ещё {}'.format(number),
+                author=User.objects.create_user(username='u{}'.format(number)),
+                group=self.group
+            )
+            Like.objects.create(user=self.user, post=post)
+        self.assertEqual(count(), before)
+
+
+@override_settings(MENTION_NOTIFY_INTERVAL=0)
+class TagsTest(TestCase):
+    def setUp(self):
+        from . import tags
+        self.tags = tags
+        self.addCleanup(tags.notifications.flush)
+        self.client = Client()
+        self.author = User.objects.create_user(username='writer')
+        self.reader = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+
+    def test_parse(self):
+        tags, mentions = self.tags.parse(
+            'Про #Django и #джанго, спасибо @reader. и a@b.c &#39;'
+        )
+        self.assertEqual(tags, {'django', 'джанго'})
+        self.assertEqual(mentions, {'reader'})
+
+    def test_index_updated_only_when_text_changes(self):
+        post = Post.objects.create(text='#один #два', author=self.author)
+        self.assertEqual(
+            set(Tag.objects.values_list('name', flat=True)), {'один', 'два'}
+        )
+        post = Post.objects.get(pk=post.pk)
+        with self.assertNumQueries(1):
+            post.save()
+        post.text = '#два #три'
+        post.save()
+        self.assertEqual(
+            set(post.tagged.values_list('tag__name', flat=True)),
+            {'два', 'три'}
+        )
+
+    def test_mentions_notified_in_batch(self):
+        from django.core import mail
+        post = Post.objects.create(text='Привет, @reader', author=self.author)
+        self.assertTrue(Mention.objects.filter(post=post, user=self.reader))
+        self.tags.notifications.add((post.pk, self.reader.pk))
+        self.tags.notifications.flush()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertIn(
+            'https://example.com/writer/{}/'.format(post.pk),
+            mail.outbox[0].body
+        )
+
+    def test_reindex_existing_posts(self):
+        from django.core import mail
+        posts = [
+            Post.objects.create(
+                text='#старое {} @reader'.format(n), author=self.author
+            )
+            for n in range(3)
+        ]
+        Tag.objects.all().delete()
+        Mention.objects.all().delete()
+        self.tags.notifications.flush()
+        mail.outbox = []
+        call_command(
+            'index_tags', '--batch-size=2', stdout=open(os.devnull, 'w')
+        )
+        tag = Tag.objects.get(name='старое')
+        self.assertEqual(
+            self.tags.tagged_posts(tag)[0], list(reversed(posts))
+        )
+        self.assertEqual(Mention.objects.filter(user=self.reader).count(), 3)
+        self.tags.notifications.flush()
+        self.assertEqual(mail.outbox, [])
+
+    def test_tag_page_cursor(self):
+        posts = [
+            Post.objects.create(text='#тема {}'.format(n), author=self.author)
+            for n in range(12)
+        ]
+        url = reverse('tag', args=['Тема'])
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['posts']), 10)
+        cursor = response.context['next_cursor']
+        self.assertEqual(cursor, posts[2].id)
+        response = self.client.get(url, {'before': cursor})
+        self.assertEqual(
+            [post.id for post in response.context['posts']],
+            [posts[1].id, posts[0].id]
+        )
+        self.assertIsNone(response.context['next_cursor'])
+
+
+class RichTextTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.author = User.objects.create_user(username='writer')
+
+    def test_render_escapes_and_links(self):
+        from .rich_text import render
+        html = render(
+            '<b>Привет</b> @writer и @nobody!\n'
+            'см. https://example.com/a?b=1&c=2. #Тема'
+        )
+        self.assertIn('&lt;b&gt;Привет&lt;/b&gt;', html)
+        self.assertIn('<a href="/writer/">@writer</a>', html)
+        self.assertIn('@nobody', html)
+        self.assertNotIn('/nobody/', html)
+        self.assertIn(
+            '<a href="https://example.com/a?b=1&amp;c=2" rel="nofollow">', html
+        )
+        self.assertIn('</a>. <a href="/tag/', html)
+        self.assertIn('<br>', html)
+
+    def test_rendered_on_save_and_shown(self):
+        post = Post.objects.create(text='Строка\nвторая', author=self.author)
+        self.assertEqual(post.text_html, '<p>Строка<br>вторая</p>')
+        post.text = 'Новый <текст>'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Новый &lt;текст&gt;</p>')
+        response = self.client.get(reverse('post', args=['writer', post.id]))
+        self.assertContains(response, '<p>Новый &lt;текст&gt;</p>', html=True)
+
+    def test_comment_edit_rerendered(self):
+        post = Post.objects.create(text='Запись', author=self.author)
+        Comment.objects.create(post=post, author=self.author, text='first')
+        comment = Comment.objects.get()
+        comment.text = 'second'
+        comment.save()
+        self.assertEqual(Comment.objects.get().text_html, '<p>second</p>')
+        comment.text = 'first'
+        comment.save()
+        self.assertEqual(Comment.objects.get().text_html, '<p>first</p>')
+
+    def test_backfill(self):
+        post = Post.objects.create(text='Старая запись', author=self.author)
+        Post.all_objects.filter(pk=post.pk).update(text_html='')
+        response = self.client.get(reverse('post', args=['writer', post.id]))
+        self.assertContains(response, 'Старая запись')
+        call_command('render_text_html', stdout=open(os.devnull, 'w'))
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Старая запись</p>')
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        self.client = Client()
+        self.author = User.objects.create_user(username='writer')
+        self.old = [
+            Post.objects.create(text='Старая {}'.format(n), author=self.author)
+            for n in range(7)
+        ]
+        for n, post in enumerate(self.old):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.now() - timedelta(days=400 - n)
+            )
+        self.new = [
+            Post.objects.create(text='Новая {}'.format(n), author=self.author)
+            for n in range(5)
+        ]
+        Comment.objects.create(
+            post=self.old[0], author=self.author, text='Комментарий'
+        )
+
+    def test_archive_moves_old_posts_in_batches(self):
+        from . import archive
+        self.assertEqual(archive.archive(days=365, batch_size=3, limit=5), 5)
+        call_command(
+            'archive_posts', '--days=365', '--batch-size=3',
+            stdout=open(os.devnull, 'w')
+        )
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(ArchivedPost.objects.count(), 7)
+        self.assertFalse(Comment.objects.exists())
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old[0].pk)
+        self.assertEqual(comment.text, 'Комментарий')
+
+    def test_archived_image_stays_referenced(self):
+        from . import archive, storage
+        Post.objects.filter(pk=self.old[0].pk).update(image='posts/a.png')
+        storage.retain('posts/a.png')
+        archive.archive(days=365)
+        self.assertTrue(storage.is_referenced('posts/a.png'))
+        self.assertEqual(
+            ArchivedPost.objects.get(pk=self.old[0].pk).image.name,
+            'posts/a.png'
+        )
+
+    def test_views_fall_through_to_archive(self):
+        from . import archive
+        archive.archive(days=365)
+        post = self.old[0]
+        response = self.client.get(reverse('post', args=['writer', post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Старая 0')
+        self.assertContains(response, 'Комментарий')
+        response = self.client.get(reverse('post', args=['writer', 999]))
+        self.assertEqual(response.status_code, 404)
+
+        url = reverse('profile', args=['writer'])
+        response = self.client.get(url)
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(
+            [post.pk for post in response.context['page']],
+            [post.pk for post in reversed(self.new)]
+            + [post.pk for post in reversed(self.old)][:5]
+        )
+        self.assertEqual(response.context['posts_count'], 12)
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(
+            [post.text for post in response.context['page']],
+            ['Старая 1', 'Старая 0']
+        )
+
+    def test_archived_image_survives_gc(self):
+        from . import archive
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.makedirs(os.path.join(media_root, 'posts'))
+        with open(os.path.join(media_root, 'posts', 'a.png'), 'wb') as f:
+            f.write(b'data')
+        Post.objects.filter(pk=self.old[0].pk).update(image='posts/a.png')
+        archive.archive(days=365)
+        with override_settings(MEDIA_ROOT=media_root):
+            call_command(
+                'gc_media', '--min-age=0', stdout=open(os.devnull, 'w')
+            )
+        self.assertTrue(
+            os.path.exists(os.path.join(media_root, 'posts', 'a.png'))
+        )
+
+    def test_archived_posts_in_sitemap(self):
+        from . import archive, sitemaps
+        archive.archive(days=365)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        names = sitemaps.build(root=root)
+        self.assertIn('sitemap-archive-1.xml', names)
+        with open(os.path.join(root, 'sitemap-archive-1.xml')) as f:
+            content = f.read()
+        for post in self.old:
+            self.assertIn('/writer/{}/</loc>'.format(post.id), content)
+
+    def test_author_deletes_archived_post(self):
+        from . import archive, storage
+        Post.objects.filter(pk=self.old[0].pk).update(image='posts/a.png')
+        storage.retain('posts/a.png')
+        archive.archive(days=365)
+        self.client.force_login(self.author)
+        url = reverse('post', args=['writer', self.old[1].pk])
+        self.assertContains(self.client.get(url), 'Удалить')
+        url = reverse('post', args=['writer', self.old[0].pk])
+        response = self.client.get(
+            reverse('post_delete', args=['writer', self.old[0].pk])
+        )
+        self.assertRedirects(response, reverse('profile', args=['writer']))
+        self.assertFalse(
+            ArchivedPost.objects.filter(pk=self.old[0].pk).exists()
+        )
+        self.assertFalse(ArchivedComment.objects.exists())
+        self.assertFalse(storage.is_referenced('posts/a.png'))
+        self.assertEqual(self.client.get(url).status_code, 404)
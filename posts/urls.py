@@ -1,14 +1,27 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug>/', views.group_posts, name='group'),
+    path('group/<slug>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug>/atom/', feeds.group_atom, name='group_atom'),
+    path('tag/<str:name>/', views.tag_posts, name='tag'),
+    path('feeds/rss/', feeds.index_rss, name='index_rss'),
+    path('feeds/atom/', feeds.index_atom, name='index_atom'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('events/posts/', views.post_events, name='post_events'),
+    path(
+        'groups/autocomplete/',
+        views.group_autocomplete,
+        name='group_autocomplete'
+    ),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('<str:username>/rss/', feeds.author_rss, name='profile_rss'),
+    path('<str:username>/atom/', feeds.author_atom, name='profile_atom'),
     path(
         '<str:username>/<int:post_id>/edit/',
         views.post_edit,
@@ -19,6 +32,11 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        '<str:username>/<int:post_id>/like/',
+        views.like_toggle,
+        name='like_toggle'
+    ),
     path(
         '<str:username>/<int:post_id>/delete/',
         views.post_delete,
@@ -0,0 +1,46 @@
+"""Версии кешей в общем кеше Django.
+
+Версия — неповторяющийся токен из времени создания и случайной части. Если
+ключа версии нет (ещё не создан или вытеснен), первый прочитавший процесс
+кладёт новый токен через cache.add, и остальные процессы читают его же.
+Старые записи под прежними токенами после этого не оживают.
+
+Если кеш ничего не хранит (DummyCache), версия живёт в памяти процесса.
+"""
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+_local = {}
+
+
+def _token(after=None):
+    now = int(time.time())
+    if after is not None:
+        now = max(now, timestamp(after) + 1)
+    return '{}-{}'.format(now, uuid4().hex)
+
+
+def get(key):
+    current = cache.get(key)
+    if current is None:
+        cache.add(key, _token(), None)
+        current = cache.get(key)
+    if current is None:
+        current = _local.setdefault(key, _token())
+    return current
+
+
+def bump(key):
+    """Заменяет версию новым токеном с более поздним временем."""
+    token = _token(cache.get(key, _local.get(key)))
+    cache.set(key, token, None)
+    _local[key] = token
+    return token
+
+
+def timestamp(version):
+    """Время создания версии в секундах."""
+    return int(version.split('-', 1)[0])
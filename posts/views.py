@@ -1,37 +1,94 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Count, Max
+from django.http import HttpResponse, JsonResponse
+from django.utils.http import is_safe_url
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST, require_safe
 
-from .models import Post, Group, Follow
+from . import (
+    archive, comment_queue, events, follow_graph, group_choices, group_stats,
+    likes, recommendations, tags, view_counter
+)
+from .media import serve_file, serve_media, serve_static
+from .models import Post, Group, GroupStats, Follow, Tag
 from .forms import PostForm, CommentForm
 
 
 User = get_user_model()
 
+FOLLOW_FEED_IN_LIMIT = 500
+SITEMAP_MAX_AGE = 60 * 60
+
+
+def author_context(request, author):
+    return {
+        'author': author,
+        'posts_count': (
+            author.posts.count() + author.archived_posts.count()
+        ),
+        'following': follow_graph.is_following(request.user.id, author.id),
+        'followers_count': follow_graph.followers_count(author.id),
+        'following_count': follow_graph.following_count(author.id),
+    }
+
 
 @cache_page(20)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     paginator = Paginator(post_list, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    likes.mark_liked(request.user, page)
     return render(
         request, 'index.html',
-        {'page': page, 'paginator': paginator}
+        {
+            'page': page,
+            'paginator': paginator,
+            'trending_groups': group_stats.trending(),
+            'events_query': '',
+        }
     )
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.select_related('author', 'group')
     paginator = Paginator(post_list, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    likes.mark_liked(request.user, page)
+    stats = GroupStats.objects.filter(group=group).first()
     return render(
         request, 'group.html',
-        {'group': group, 'page': page, 'paginator': paginator}
+        {
+            'group': group,
+            'stats': stats,
+            'page': page,
+            'paginator': paginator,
+            'trending_groups': group_stats.trending(),
+            'events_query': 'group={}'.format(group.id),
+        }
+    )
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    before = request.GET.get('before')
+    posts, has_next = tags.tagged_posts(
+        tag, int(before) if before and before.isdigit() else None
+    )
+    likes.mark_liked(request.user, posts)
+    return render(
+        request, 'tag.html',
+        {
+            'tag': tag,
+            'posts': posts,
+            'next_cursor': posts[-1].id if has_next else None,
+        }
     )
 
 
@@ -51,43 +108,43 @@ def new_post(request):
 
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    post_list = archive.Chain(
+        author.posts.select_related('author', 'group'),
+        author.archived_posts.select_related('author', 'group')
+    )
     paginator = Paginator(post_list, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated:
-        if request.user.follower.filter(author=author).exists():
-            following = True
-    return render(
-        request, 'profile.html',
-        {
-            'author': author,
-            'page': page,
-            'paginator': paginator,
-            'following': following
-        }
-    )
+    likes.mark_liked(request.user, page)
+    view_counter.profile_viewed(author)
+    context = author_context(request, author)
+    context.update({
+        'page': page,
+        'paginator': paginator,
+        'suggested_authors': recommendations.suggested_authors(request.user),
+        'profile_views': view_counter.profile_views(author),
+    })
+    return render(request, 'profile.html', context)
 
 
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = archive.get_post(username, post_id)
+    if not post.is_archived:
+        view_counter.post_viewed(post)
+    likes.mark_liked(request.user, [post])
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-    following = False
-    if request.user.is_authenticated:
-        if request.user.follower.filter(author=post.author).exists:
-            following = True
-    return render(
-        request, 'post.html',
-        {
-            'post': post,
-            'author': post.author,
-            'comments': comments,
-            'form': form,
-            'following': following
-        }
-    )
+    comments = post.comments.select_related('author')
+    pending_comments = []
+    if comment_queue.enabled() and request.user.is_authenticated:
+        pending_comments = comment_queue.pending_for(post.id, request.user.id)
+    context = author_context(request, post.author)
+    context.update({
+        'post': post,
+        'comments': comments,
+        'pending_comments': pending_comments,
+        'form': form,
+    })
+    return render(request, 'post.html', context)
 
 
 @login_required
@@ -121,6 +178,25 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+@require_safe
+def media(request, path):
+    return serve_media(request, path)
+
+
+@require_safe
+def static(request, path):
+    return serve_static(request, path)
+
+
+@require_safe
+def sitemap(request, path):
+    return serve_file(
+        request, path, settings.SITEMAP_ROOT,
+        max_age=SITEMAP_MAX_AGE,
+        precompressed=True
+    )
+
+
 @login_required
 def add_comment(request, username, post_id):
     form = CommentForm(request.POST or None)
@@ -129,20 +205,49 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        if comment_queue.enabled():
+            comment_queue.enqueue(comment)
+        else:
+            comment.save()
         return redirect('post', username, post_id)
     return render(request, 'comments.html', {'form': form})
 
 
+@login_required
+@require_POST
+def like_toggle(request, username, post_id):
+    post = get_object_or_404(Post, id=post_id, author__username=username)
+    likes.toggle(request.user, post)
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('post', username, post_id)
+
+
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    authors = follow_graph.following(request.user.id)
+    if len(authors) > FOLLOW_FEED_IN_LIMIT:
+        post_list = Post.objects.filter(author__following__user=request.user)
+    else:
+        post_list = Post.objects.filter(author_id__in=list(authors))
+    post_list = post_list.select_related('author', 'group')
     paginator = Paginator(post_list, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    likes.mark_liked(request.user, page)
+    suggested_authors = recommendations.suggested_authors(request.user)
+    events_query = 'authors={}'.format(
+        ','.join(str(pk) for pk in authors[:events.MAX_AUTHORS])
+    )
     return render(
         request, 'follow.html',
-        {'page': page, 'paginator': paginator}
+        {
+            'page': page,
+            'paginator': paginator,
+            'suggested_authors': suggested_authors,
+            'events_query': events_query,
+        }
     )
 
 
@@ -166,7 +271,39 @@ def profile_unfollow(request, username):
 
 @login_required
 def post_delete(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = archive.get_post(username, post_id)
     if request.user == post.author:
-        post.delete()
+        if post.is_archived:
+            post.delete()
+        else:
+            post.tombstone()
         return redirect('profile', username)
+    return redirect('post', username, post_id)
+
+
+def post_events(request):
+    feed = events.parse_filter(request.GET)
+    last_event = request.META.get('HTTP_LAST_EVENT_ID', '')
+    if last_event.isdigit():
+        feed['last_id'] = max(feed['last_id'], int(last_event))
+    post_list = Post.objects.filter(pk__gt=feed['last_id'])
+    if feed['group'] is not None:
+        post_list = post_list.filter(group_id=feed['group'])
+    if feed['authors'] is not None:
+        post_list = post_list.filter(author_id__in=feed['authors'])
+    new = post_list.aggregate(count=Count('pk'), last_id=Max('pk'))
+    body = 'retry: {}\n\n'.format(events.RETRY_MS).encode()
+    if new['count']:
+        body += events.format_event(new['last_id'], new['count'])
+    response = HttpResponse(body, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@login_required
+@require_safe
+def group_autocomplete(request):
+    groups = group_choices.search(request.GET.get('q', '').strip())
+    return JsonResponse({
+        'results': [{'id': pk, 'title': title} for pk, title in groups]
+    })
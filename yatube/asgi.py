@@ -0,0 +1,202 @@
+"""
+ASGI config for yatube project.
+
+Django 2.2 has no native ASGI handler and no async views, so the WSGI
+application is wrapped in a small adapter and every view still runs
+synchronously, one at a time per pool thread. The adapter only moves socket
+I/O to the event loop: request bodies are read there before a thread is
+taken, and the response is handed back through a queue of up to
+RESPONSE_BUFFER_CHUNKS chunks. For ordinary pages the thread is released as
+soon as the view returns, even if the client reads slowly; longer streamed
+responses hold the thread while the queue is full. Django runs in a bounded
+thread pool (ASGI_THREADS), so idle keep-alive connections do not take a
+thread either. DB and cache lookups inside a view are not made concurrent.
+
+Server-sent events for new posts (posts.events.EVENTS_PATH) are handled
+natively on the event loop and never reach the thread pool.
+
+Run with any ASGI server, e.g. ``uvicorn yatube.asgi:application``.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+BODY_MEMORY_LIMIT = 1024 * 1024
+RESPONSE_BUFFER_CHUNKS = 64
+
+
+class WsgiToAsgi:
+    def __init__(self, wsgi_application, max_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='yatube-wsgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(
+                'Unsupported scope type: {}'.format(scope['type'])
+            )
+        body = await self.read_body(receive)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=RESPONSE_BUFFER_CHUNKS)
+        sender = asyncio.ensure_future(self.drain(queue, send))
+        try:
+            await loop.run_in_executor(
+                self.executor, self.run_wsgi, scope, body, queue, loop
+            )
+        except BaseException:
+            sender.cancel()
+            raise
+        await sender
+
+    async def drain(self, queue, send):
+        """Sends queued messages; after a failed send keeps only draining."""
+        error = None
+        while True:
+            message = await queue.get()
+            if error is None:
+                try:
+                    await send(message)
+                except Exception as exc:
+                    error = exc
+            if message['type'] == 'http.response.body' \
+                    and not message.get('more_body', False):
+                break
+        if error is not None:
+            raise error
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = SpooledTemporaryFile(max_size=BODY_MEMORY_LIMIT)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def build_environ(self, scope, body):
+        script_name = scope.get('root_path', '')
+        path_info = scope['path'][len(script_name):] \
+            if scope['path'].startswith(script_name) else scope['path']
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path_info.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_PROTOCOL': 'HTTP/{}'.format(
+                scope.get('http_version', '1.1')
+            ),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        server = scope.get('server') or ('localhost', 80)
+        environ['SERVER_NAME'] = server[0]
+        environ['SERVER_PORT'] = str(server[1])
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+            environ['REMOTE_PORT'] = str(scope['client'][1])
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+                key = name
+            else:
+                key = 'HTTP_' + name
+            if key in environ:
+                # HTTP/2 sends each cookie as a separate header.
+                separator = '; ' if key == 'HTTP_COOKIE' else ','
+                value = environ[key] + separator + value
+            environ[key] = value
+        return environ
+
+    def run_wsgi(self, scope, body, queue, loop):
+        """Runs in the pool; blocks only while the response queue is full."""
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        def send_start():
+            if not response.get('started'):
+                response['started'] = True
+                send_sync({
+                    'type': 'http.response.start',
+                    'status': response['status'],
+                    'headers': response['headers'],
+                })
+
+        environ = self.build_environ(scope, body)
+        result = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    send_start()
+                    send_sync({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_start()
+            send_sync({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+            body.close()
+
+
+class EventsRouter:
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        from posts import events
+
+        if scope['type'] == 'http' and scope['path'] == events.EVENTS_PATH:
+            return await events.stream(scope, receive, send)
+        return await self.application(scope, receive, send)
+
+
+application = EventsRouter(WsgiToAsgi(
+    get_wsgi_application(),
+    max_workers=int(os.environ.get('ASGI_THREADS', 16))
+))
+
+if settings.WARM_TEMPLATES:
+    from posts.templates_warmup import warm_on_startup
+    warm_on_startup()
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+from . import routers
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+COMPRESSIBLE_TYPES = (
+    'text/html', 'text/plain', 'text/css', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/atom+xml',
+)
+
+
+class GZipTextMiddleware(GZipMiddleware):
+    """GZip only for buffered text responses, switched by GZIP_RESPONSES.
+
+    Streaming responses (server-sent events, media files, ranges) and
+    precompressed static files pass through untouched.
+    """
+
+    def process_response(self, request, response):
+        if not getattr(settings, 'GZIP_RESPONSES', False):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';', 1)[0]
+        if content_type.strip() not in COMPRESSIBLE_TYPES:
+            return response
+        return super().process_response(request, response)
+
+
+class ReplicaPinMiddleware:
+    """Lets read-only requests use replicas and pins writers to the primary.
+
+    After a request that wrote to the database, or may write to it later
+    (queued comments), the client gets a short-lived cookie; while it is
+    present all reads go to the primary.
+    """
+    cookie_name = 'db_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in SAFE_METHODS
+        routers.start_request(
+            pinned=unsafe or self.cookie_name in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.finish_request()
+        if wrote or unsafe:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,79 @@
+"""
+Database routing between the primary and read-only replicas.
+
+Reads go to a random alias from DATABASE_REPLICAS only while a request marked
+by ReplicaPinMiddleware is running; management commands, tests and anything
+outside a request keep using the primary. A request that writes, or any
+request from a client that wrote less than REPLICA_PIN_SECONDS ago, reads
+from the primary so users always see their own changes.
+
+Data that is put into a shared cache is served to every client, including
+pinned ones, so code that fills such caches reads inside ``primary()``.
+DatabaseCache entries (app label ``django_cache``) always live on the primary,
+and filling the cache does not count as a write that pins the client.
+"""
+
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+CACHE_APP_LABEL = 'django_cache'
+
+_state = threading.local()
+
+
+def start_request(pinned):
+    _state.active = True
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def finish_request():
+    wrote = getattr(_state, 'wrote', False)
+    _state.active = False
+    _state.pinned = False
+    _state.wrote = False
+    return wrote
+
+
+@contextmanager
+def primary():
+    """Sends all reads inside the block to the primary."""
+    previous = getattr(_state, 'forced', False)
+    _state.forced = True
+    try:
+        yield
+    finally:
+        _state.forced = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return PRIMARY
+        if not replicas or not getattr(_state, 'active', False):
+            return PRIMARY
+        if _state.pinned or getattr(_state, 'forced', False):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return PRIMARY
+        if getattr(_state, 'active', False):
+            _state.pinned = True
+            _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *getattr(settings, 'DATABASE_REPLICAS', [])}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
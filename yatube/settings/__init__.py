@@ -0,0 +1,14 @@
+import os
+
+# Профиль выбирается переменной DJANGO_ENV. Его можно указать и напрямую,
+# например DJANGO_SETTINGS_MODULE=yatube.settings.test — тогда этот модуль
+# ничего не загружает.
+if os.environ.get('DJANGO_SETTINGS_MODULE', __name__) == __name__:
+    ENVIRONMENT = os.environ.get('DJANGO_ENV', 'dev')
+
+    if ENVIRONMENT == 'prod':
+        from .prod import *  # noqa: F401,F403
+    elif ENVIRONMENT == 'test':
+        from .test import *  # noqa: F401,F403
+    else:
+        from .dev import *  # noqa: F401,F403
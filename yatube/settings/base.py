@@ -0,0 +1,301 @@
+"""
+Django settings for yatube project.
+
+Generated by 'django-admin startproject' using Django 2.2.
+
+Every deployment-specific value is read from the environment. The dev, test
+and prod modules only change the defaults of those variables before
+importing this file; yatube.settings picks one of them by DJANGO_ENV.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+
+def env(name, default=None):
+    return os.environ.get(name, default)
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default=0):
+    return int(os.environ.get(name, default))
+
+
+def env_list(name, default=()):
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = env(
+    'DJANGO_SECRET_KEY',
+    'oz-vkz_zu^&j9lzg76sp3#1u2vh6vt*m21)xbfcv+%24mhr$d$'
+)
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = env_bool('DJANGO_DEBUG', False)
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', [
+        'localhost',
+        '127.0.0.1',
+        '[::1]',
+        'testserver',
+])
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'users',
+    'posts',
+    'django.contrib.sites',
+    'django.contrib.flatpages',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+]
+
+SITE_ID = 1
+# Протокол абсолютных ссылок в письмах и карте сайта (posts.links).
+SITE_PROTOCOL = env('DJANGO_SITE_PROTOCOL', 'https')
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'yatube.middleware.GZipTextMiddleware',
+    'yatube.middleware.ReplicaPinMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+INCLUDES_DIR = os.path.join(BASE_DIR, "templates", "includes")
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Скомпилированные шаблоны держатся в памяти процесса: повторный рендер
+# include-ов не читает и не разбирает файлы заново.
+CACHED_TEMPLATES = env_bool('DJANGO_CACHED_TEMPLATES', not DEBUG)
+if CACHED_TEMPLATES:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Компилировать все шаблоны при старте процесса (posts.templates_warmup).
+WARM_TEMPLATES = env_bool('DJANGO_WARM_TEMPLATES', CACHED_TEMPLATES)
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR, INCLUDES_DIR],
+        'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'yatube.processors.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DB_ENGINE = env('DJANGO_DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('DJANGO_DB_NAME', 'yatube'),
+            'USER': env('DJANGO_DB_USER', 'yatube'),
+            'PASSWORD': env('DJANGO_DB_PASSWORD', ''),
+            'HOST': env('DJANGO_DB_HOST', 'localhost'),
+            'PORT': env('DJANGO_DB_PORT', '5432'),
+            'CONN_MAX_AGE': env_int('DJANGO_CONN_MAX_AGE', 0),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env(
+                'DJANGO_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+            ),
+            # Соединение переиспользуется между запросами, пока не истечёт.
+            'CONN_MAX_AGE': env_int('DJANGO_CONN_MAX_AGE', 0),
+        }
+    }
+
+# Выполняются для каждого нового соединения с SQLite (posts.signals).
+# WAL позволяет читать во время записи, а busy_timeout заставляет писателей
+# ждать блокировку вместо ошибки «database is locked».
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': env_int('DJANGO_SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    'busy_timeout': env_int('DJANGO_SQLITE_BUSY_TIMEOUT', 5000),
+    'temp_store': 'MEMORY',
+}
+
+# Реплики только для чтения: пути к копиям файла SQLite или хосты PostgreSQL
+# через запятую. Локально: cp db.sqlite3 replica.sqlite3 и
+# DJANGO_DB_REPLICAS=replica.sqlite3.
+DATABASE_REPLICAS = []
+for number, location in enumerate(env_list('DJANGO_DB_REPLICAS'), 1):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    replica['HOST' if DB_ENGINE == 'postgresql' else 'NAME'] = location
+    DATABASES['replica{}'.format(number)] = replica
+    DATABASE_REPLICAS.append('replica{}'.format(number))
+
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+
+# Комментарии копятся в памяти процесса и вставляются пачкой раз в
+# COMMENT_FLUSH_INTERVAL секунд (posts.comment_queue). Нужен общий кеш, а
+# при падении процесса комментарии последнего интервала теряются.
+COMMENT_QUEUE = env_bool('DJANGO_COMMENT_QUEUE', False)
+COMMENT_FLUSH_INTERVAL = float(env('DJANGO_COMMENT_FLUSH_INTERVAL', 0.5))
+
+# Просмотры записей и профилей сбрасываются в базу раз в столько секунд.
+VIEW_COUNT_FLUSH_INTERVAL = float(env('DJANGO_VIEW_COUNT_FLUSH_INTERVAL', 10))
+
+# Письма об упоминаниях отправляются пачкой раз в столько секунд.
+MENTION_NOTIFY_INTERVAL = float(env('DJANGO_MENTION_NOTIFY_INTERVAL', 5))
+
+# Записи старше стольких дней archive_posts переносит в архивные таблицы.
+ARCHIVE_AFTER_DAYS = env_int('DJANGO_ARCHIVE_AFTER_DAYS', 365)
+
+# Сколько секунд после записи пользователь читает только с основной базы.
+REPLICA_PIN_SECONDS = env_int('DJANGO_REPLICA_PIN_SECONDS', 10)
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+STATIC_ROOT = env('DJANGO_STATIC_ROOT', os.path.join(BASE_DIR, "static"))
+
+# collectstatic кладёт файлы с хешем в имени, манифест и копии .gz/.br.
+STATICFILES_STORAGE = 'posts.storage.CompressedManifestStaticFilesStorage'
+
+# Отдавать статику приложением и при DEBUG = False (если нет nginx).
+SERVE_STATIC = env_bool('DJANGO_SERVE_STATIC', False)
+
+# Файлы карты сайта, их пишет команда build_sitemaps.
+SITEMAP_ROOT = env('DJANGO_SITEMAP_ROOT', os.path.join(BASE_DIR, 'sitemaps'))
+
+# Куда prerender_flatpages складывает готовые статические страницы.
+FLATPAGES_PRERENDER_ROOT = env(
+    'DJANGO_FLATPAGES_PRERENDER_ROOT', os.path.join(BASE_DIR, 'prerendered')
+)
+
+# Сжатие HTML и JSON ответов приложения (yatube.middleware).
+GZIP_RESPONSES = env_bool('DJANGO_GZIP', False)
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = env('DJANGO_MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+DEFAULT_FILE_STORAGE = 'posts.storage.ContentAddressedStorage'
+
+# Внутренний location nginx (internal) для X-Accel-Redirect, например
+# '/protected-media/'. None — файлы отдаёт само приложение.
+MEDIA_ACCEL_REDIRECT_PREFIX = env('DJANGO_MEDIA_ACCEL_REDIRECT_PREFIX')
+MEDIA_SENDFILE_HEADER = env('DJANGO_MEDIA_SENDFILE_HEADER', 'X-Accel-Redirect')
+
+LOGIN_URL = "/auth/login/"
+LOGIN_REDIRECT_URL = "index"
+
+CACHES = {
+    'default': {
+        'BACKEND': env(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.dummy.DummyCache'
+        ),
+        'LOCATION': env('DJANGO_CACHE_LOCATION', ''),
+        'TIMEOUT': env_int('DJANGO_CACHE_TIMEOUT', 300),
+    }
+}
+
+EMAIL_BACKEND = env(
+    'DJANGO_EMAIL_BACKEND', "django.core.mail.backends.filebased.EmailBackend"
+)
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+
+# HTTPS за обратным прокси.
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+SECURE_SSL_REDIRECT = env_bool('DJANGO_SECURE_SSL_REDIRECT', False)
+SESSION_COOKIE_SECURE = env_bool('DJANGO_SECURE_COOKIES', False)
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+SECURE_HSTS_SECONDS = env_int('DJANGO_SECURE_HSTS_SECONDS', 0)
+SECURE_CONTENT_TYPE_NOSNIFF = True
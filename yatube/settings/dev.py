@@ -0,0 +1,5 @@
+import os
+
+os.environ.setdefault('DJANGO_DEBUG', 'true')
+
+from .base import *  # noqa: E402,F401,F403
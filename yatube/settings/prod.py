@@ -0,0 +1,31 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+os.environ.setdefault('DJANGO_DEBUG', 'false')
+os.environ.setdefault('DJANGO_CONN_MAX_AGE', '600')
+os.environ.setdefault('DJANGO_CACHED_TEMPLATES', 'true')
+os.environ.setdefault('DJANGO_SERVE_STATIC', 'true')
+os.environ.setdefault('DJANGO_GZIP', 'true')
+os.environ.setdefault('DJANGO_SECURE_COOKIES', 'true')
+
+from .base import *  # noqa: E402,F401,F403
+
+if SECRET_KEY.startswith('oz-vkz'):  # noqa: F405
+    raise ImproperlyConfigured('Задайте DJANGO_SECRET_KEY')
+
+# Версии кешей (follow_graph, группы, flatpages, ленты) должны быть общими
+# для всех процессов, иначе каждый воркер отдаёт устаревшие данные. Бэкенд
+# по умолчанию не выбирается: DatabaseCache с MAX_ENTRIES=300 вытесняет
+# ключи версий первыми и нагружает ту же базу, что и приложение.
+if 'DJANGO_CACHE_BACKEND' not in os.environ:
+    raise ImproperlyConfigured(
+        'Задайте общий кеш: DJANGO_CACHE_BACKEND и DJANGO_CACHE_LOCATION, '
+        'например django.core.cache.backends.memcached.MemcachedCache'
+    )
+if CACHES['default']['BACKEND'].endswith('LocMemCache') \
+        and not env_bool('DJANGO_SINGLE_WORKER', False):  # noqa: F405
+    raise ImproperlyConfigured(
+        'LocMemCache не общий для воркеров: задайте DJANGO_CACHE_BACKEND '
+        '(например Memcached) или DJANGO_SINGLE_WORKER=true'
+    )
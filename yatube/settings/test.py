@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+os.environ.setdefault('DJANGO_DEBUG', 'false')
+os.environ.setdefault('DJANGO_WARM_TEMPLATES', 'false')
+os.environ.setdefault(
+    'DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.locmem.EmailBackend'
+)
+os.environ.setdefault(
+    'DJANGO_MEDIA_ROOT', os.path.join(tempfile.gettempdir(), 'yatube-media')
+)
+
+from .base import *  # noqa: E402,F401,F403
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
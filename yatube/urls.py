@@ -1,9 +1,10 @@
 from django.contrib import admin
-from django.contrib.flatpages import views
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf.urls import handler404, handler500
 from django.conf import settings
-from django.conf.urls.static import static
+
+from posts import flatpages
+from posts.views import media, sitemap, static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,19 +12,30 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path(
-        'about-author/', views.flatpage, {'url': '/about-author/'}, name='about'
+        'about-author/',
+        flatpages.flatpage,
+        {'url': '/about-author/'},
+        name='about'
+    ),
+    path(
+        'about-spec/',
+        flatpages.flatpage,
+        {'url': '/about-spec/'},
+        name='spec'
     ),
-    path('about-spec/', views.flatpage, {'url': '/about-spec/'}, name='spec'),
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+        media,
+        name='media'
+    ),
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.STATIC_URL.lstrip('/')),
+        static,
+        name='static'
+    ),
+    re_path(r'^(?P<path>sitemap[\w-]*\.xml)$', sitemap, name='sitemap'),
     path('', include('posts.urls')),
 ]
 
 handler404 = 'posts.views.page_not_found'
 handler500 = 'posts.views.server_error'
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
-    urlpatterns += static(
-        settings.STATIC_URL, document_root=settings.STATIC_ROOT
-    )